@@ -0,0 +1,64 @@
+"""
+OpenAI-compatible chat completions stand-in, for benchmarks only.
+
+Each request sleeps FAKE_LLM_LATENCY seconds plus FAKE_LLM_SECONDS_PER_TOKEN
+per completion token, then returns a canned answer with a usage block.
+Point the crew at it with LLM_BASE_URL=http://127.0.0.1:3102/v1. Run with:
+
+    uvicorn fake_llm:app --app-dir benchmarks --port 3102
+"""
+import os
+import time
+import uuid
+import asyncio
+from fastapi import FastAPI, Request
+
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+SECONDS_PER_TOKEN = float(os.getenv("FAKE_LLM_SECONDS_PER_TOKEN", "0"))
+COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "120"))
+
+app = FastAPI(title="Fake LLM")
+
+counters = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+ANSWER = (
+    "Thought: I now can give a great answer\n"
+    "Final Answer: " + " ".join(["benchmark"] * COMPLETION_TOKENS)
+)
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+    await asyncio.sleep(LATENCY + SECONDS_PER_TOKEN * COMPLETION_TOKENS)
+    counters["requests"] += 1
+    counters["prompt_tokens"] += prompt_tokens
+    counters["completion_tokens"] += COMPLETION_TOKENS
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": ANSWER},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": COMPLETION_TOKENS,
+            "total_tokens": prompt_tokens + COMPLETION_TOKENS,
+        },
+    }
+
+
+@app.get("/v1/stats")
+async def stats():
+    return counters
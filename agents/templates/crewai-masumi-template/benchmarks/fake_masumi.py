@@ -0,0 +1,129 @@
+"""
+Local stand-in for the Masumi payment service, for benchmarks only.
+
+Implements the endpoints the agent's Payment objects call:
+    POST /api/v1/payment/                -> create a payment request
+    GET  /api/v1/payment/                -> list payments (paginated, newest first)
+    POST /api/v1/payment/resolve-blockchain-identifier -> look up one payment
+    POST /api/v1/payment/submit-result   -> submit the result hash
+
+A payment reports no on-chain state until FAKE_CONFIRM_DELAY seconds after
+it was created, then "FundsLocked", and "ResultSubmitted" once a result was
+submitted. GET /api/v1/health/ reports request counts and how many
+connections clients opened. Run with:
+
+    uvicorn fake_masumi:app --app-dir benchmarks --port 3101
+"""
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime, timezone, timedelta
+from fastapi import FastAPI, Request, HTTPException
+
+CONFIRM_DELAY = float(os.getenv("FAKE_CONFIRM_DELAY", "2"))
+RESPONSE_LATENCY = float(os.getenv("FAKE_PAYMENT_LATENCY", "0.02"))
+
+app = FastAPI(title="Fake Masumi Payment Service")
+
+payments = {}
+counters = {"create": 0, "list": 0, "resolve": 0, "submit": 0}
+# (host, port) of every client connection; one entry per TCP connection the agent opened
+peers = set()
+
+
+@app.middleware("http")
+async def count_connections(request: Request, call_next):
+    if request.client is not None:
+        peers.add((request.client.host, request.client.port))
+    return await call_next(request)
+
+
+def _iso(delta_hours):
+    return (datetime.now(timezone.utc) + timedelta(hours=delta_hours)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _state(payment):
+    if payment["result_hash"] is not None:
+        return "ResultSubmitted"
+    if time.monotonic() - payment["created_at"] >= CONFIRM_DELAY:
+        return "FundsLocked"
+    return None
+
+
+@app.post("/api/v1/payment/")
+async def create_payment(request: Request):
+    body = await request.json()
+    await asyncio.sleep(RESPONSE_LATENCY)
+    counters["create"] += 1
+    blockchain_identifier = uuid.uuid4().hex
+    payments[blockchain_identifier] = {
+        "created_at": time.monotonic(),
+        "identifier_from_purchaser": body.get("identifierFromPurchaser"),
+        "result_hash": None,
+    }
+    return {
+        "status": "success",
+        "data": {
+            "blockchainIdentifier": blockchain_identifier,
+            "payByTime": body.get("payByTime", _iso(12)),
+            "submitResultTime": body.get("submitResultTime", _iso(24)),
+            "unlockTime": _iso(30),
+            "externalDisputeUnlockTime": _iso(36),
+        },
+    }
+
+
+@app.get("/api/v1/payment/")
+async def list_payments(network: str = "Preprod", limit: int = 100, cursorId: str = None):
+    await asyncio.sleep(RESPONSE_LATENCY)
+    counters["list"] += 1
+    # Newest first, like the real service
+    identifiers = list(reversed(payments))
+    start = identifiers.index(cursorId) + 1 if cursorId in payments else 0
+    page = identifiers[start:start + limit]
+    return {
+        "status": "success",
+        "data": {
+            "Payments": [_listing(blockchain_identifier) for blockchain_identifier in page],
+            "cursorId": page[-1] if len(page) == limit else None,
+        },
+    }
+
+
+def _listing(blockchain_identifier):
+    return {
+        "blockchainIdentifier": blockchain_identifier,
+        "onChainState": _state(payments[blockchain_identifier]),
+        "NextAction": {"requestedAction": "WaitingForExternalAction"},
+        "resultHash": payments[blockchain_identifier]["result_hash"],
+    }
+
+
+@app.post("/api/v1/payment/resolve-blockchain-identifier")
+async def resolve_payment(request: Request):
+    body = await request.json()
+    await asyncio.sleep(RESPONSE_LATENCY)
+    counters["resolve"] += 1
+    if body.get("blockchainIdentifier") not in payments:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return {"status": "success", "data": _listing(body["blockchainIdentifier"])}
+
+
+@app.post("/api/v1/payment/submit-result")
+async def submit_result(request: Request):
+    body = await request.json()
+    await asyncio.sleep(RESPONSE_LATENCY)
+    payment = payments.get(body.get("blockchainIdentifier"))
+    if payment is None:
+        raise HTTPException(status_code=400, detail="Unknown blockchainIdentifier")
+    if payment["result_hash"] is not None:
+        raise HTTPException(status_code=400, detail="Result already submitted")
+    counters["submit"] += 1
+    payment["result_hash"] = body.get("submitResultHash")
+    return {"status": "success", "data": {"blockchainIdentifier": body.get("blockchainIdentifier")}}
+
+
+@app.get("/api/v1/health/")
+async def health():
+    return {"status": "success", "data": {"status": "ok", "requests": counters, "connections": len(peers), "payments": len(payments)}}
@@ -0,0 +1,184 @@
+"""
+Memory benchmark for completed job records
+
+Fills an in-memory job table with completed jobs, the way the API does
+(created awaiting payment, then marked running, then completed with a
+result), and reports the bytes held per job, measured with tracemalloc, for
+each record layout:
+
+- ``crew_output``: a job dict holding the crew's CrewOutput, as the original
+  template did (only when crewai is installed)
+- ``dict``: a job dict holding the raw result string
+- ``job_record``: the slotted JobRecord used by MemoryJobStore
+- ``job_record_compressed``: JobRecord with large results compressed
+
+    python benchmarks/job_memory.py --jobs 2000 --result-chars 4000
+
+Results are drawn from the knowledgebase text when it exists, so they
+compress like real answers rather than like repeated filler.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from job_store import JOB_FIELDS, MemoryJobStore
+from knowledge_index import fingerprint_directory
+
+
+def load_source_text(directory):
+    """Concatenated text of the knowledgebase's text files, or generated prose when there are none"""
+    parts = []
+    if os.path.isdir(directory):
+        for source in fingerprint_directory(directory, extensions=(".txt", ".md")):
+            with open(os.path.join(directory, source), encoding="utf-8", errors="replace") as handle:
+                parts.append(handle.read())
+    text = "\n\n".join(parts)
+    if len(text) < 10000:
+        rng = random.Random(0)
+        words = ("payment agent result network ledger research summary market token input crew model "
+                 "output status service request identifier protocol value").split()
+        text = " ".join(rng.choice(words) for _ in range(50000))
+    return text
+
+
+def iter_results(text, count, chars):
+    """``count`` results of ``chars`` characters, each a fresh string sliced from ``text``"""
+    rng = random.Random(1)
+    for _ in range(count):
+        start = rng.randrange(0, max(1, len(text) - chars))
+        yield text[start:start + chars]
+
+
+def make_crew_output(result):
+    """A CrewOutput shaped like ResearchCrew's (two tasks), or None without crewai"""
+    try:
+        from crewai.crews.crew_output import CrewOutput
+        from crewai.tasks.task_output import TaskOutput
+        from crewai.types.usage_metrics import UsageMetrics
+    except ImportError:
+        return None
+    research = TaskOutput(
+        description="Research and analyze the following text: {text}",
+        expected_output="Detailed research findings about the topic",
+        raw=result,
+        agent="Research Analyst",
+    )
+    summary = TaskOutput(
+        description="Create a concise summary of the research findings",
+        expected_output="A clear, concise summary of the research findings",
+        raw=result,
+        agent="Content Summarizer",
+    )
+    usage = UsageMetrics(total_tokens=4200, prompt_tokens=3400, completion_tokens=800, successful_requests=2)
+    return CrewOutput(raw=result, tasks_output=[research, summary], token_usage=usage)
+
+
+class DictJobs:
+    """Job table keeping one plain dict per job, as MemoryJobStore did before JobRecord"""
+
+    def __init__(self):
+        self._jobs = {}
+
+    def create(self, job_id, **fields):
+        now = time.time()
+        job = {name: None for name in JOB_FIELDS}
+        job.update(fields, job_id=job_id, created_at=now, updated_at=now)
+        self._jobs[job_id] = job
+
+    def update(self, job_id, **fields):
+        self._jobs[job_id].update(fields, updated_at=time.time())
+
+
+def fill(store, results, wrap_result=None):
+    """Run every job through the awaiting_payment -> running -> completed lifecycle"""
+    for index, result in enumerate(results):
+        job_id = str(uuid.uuid4())
+        store.create(
+            job_id,
+            status="awaiting_payment",
+            payment_status="pending",
+            blockchain_identifier=f"{uuid.uuid4().hex}{uuid.uuid4().hex}",
+            input_data={"text": f"Research question number {index} about Cardano payments"},
+            identifier_from_purchaser=uuid.uuid4().hex[:16],
+        )
+        store.update(job_id, status="running")
+        store.update(
+            job_id,
+            status="completed",
+            payment_status="completed",
+            result=wrap_result(result) if wrap_result else result,
+        )
+
+
+def measure(build_store, text, jobs, result_chars, wrap_result=None):
+    """
+    Bytes allocated per job by a freshly filled store
+
+    Results are created inside the measured window and only the store keeps
+    them, so their size (raw, compressed or wrapped) counts towards the job.
+    """
+    if wrap_result is not None and wrap_result("") is None:
+        return None
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    store = build_store()
+    fill(store, iter_results(text, jobs, result_chars), wrap_result)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del store
+    return round(total / jobs)
+
+
+def run_benchmark(jobs, result_chars, directory):
+    text = load_source_text(directory)
+    rows = {
+        "crew_output": measure(DictJobs, text, jobs, result_chars, make_crew_output),
+        "dict": measure(DictJobs, text, jobs, result_chars),
+        "job_record": measure(lambda: MemoryJobStore(compress_min_bytes=0), text, jobs, result_chars),
+        "job_record_compressed": measure(lambda: MemoryJobStore(compress_min_bytes=1024), text, jobs, result_chars),
+    }
+    return {"jobs": jobs, "result_chars": result_chars, "bytes_per_job": rows}
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"Bytes held per completed job ({report['jobs']} jobs, {report['result_chars']}-character results)")
+    reference = report["bytes_per_job"]["dict"]
+    for layout, size in report["bytes_per_job"].items():
+        if size is None:
+            print(f"{layout:<24} {'skipped (crewai not installed)':>30}")
+            continue
+        print(f"{layout:<24} {size:>12,} bytes {(size - reference) / reference * 100:+8.1f}% vs dict")
+    print("=" * 60 + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2000, help="Completed jobs to hold")
+    parser.add_argument("--result-chars", type=int, default=4000, help="Length of each job's result")
+    parser.add_argument("--knowledgebase", default=os.getenv("KNOWLEDGEBASE_DIR", "knowledgebase"),
+                        help="Directory whose text is sampled for results")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = run_benchmark(args.jobs, args.result_chars, args.knowledgebase)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+End-to-end load test for the agent API
+
+Starts the fake payment service, the fake LLM and `python main.py api` as
+subprocesses, then drives /start_job -> /status for a number of jobs at a
+fixed concurrency and reports throughput, latency percentiles and the
+agent's memory growth.
+
+    python benchmarks/loadtest.py --jobs 200 --concurrency 20
+
+Use --agent-url to benchmark an already running agent instead (it must be
+configured against the fakes, or a real payment service, by the caller).
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.dirname(BENCHMARK_DIR)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Count, mean and p50/p95/p99/max of latencies, in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def read_rss_kb(pid):
+    """Resident set size of a process and its child processes (API workers) in KiB, read from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            rss = next((int(line.split()[1]) for line in status_file if line.startswith("VmRSS:")), None)
+        with open(f"/proc/{pid}/task/{pid}/children") as children_file:
+            children = [int(child) for child in children_file.read().split()]
+    except (OSError, ValueError):
+        return None
+    for child in children:
+        child_rss = read_rss_kb(child)
+        if rss is not None and child_rss is not None:
+            rss += child_rss
+    return rss
+
+
+def start_process(args, env, log_path):
+    log_file = open(log_path, "w")
+    return subprocess.Popen(args, cwd=TEMPLATE_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def start_fake(module, port, env):
+    return start_process(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--app-dir", BENCHMARK_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env,
+        os.path.join(env["BENCHMARK_LOG_DIR"], f"{module}.log"),
+    )
+
+
+async def wait_until_ready(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get(url)
+            # /availability answers while the agent is still loading its crew stack
+            if response.status_code == 200 and response.json().get("status", "available") == "available":
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+class LoadTest:
+    """
+    Runs ``jobs`` purchases through the agent with ``concurrency`` in flight
+
+    Args:
+        agent_url: Base URL of the agent API
+        jobs: Total number of jobs to start
+        concurrency: Jobs in flight at the same time
+        status_interval: Seconds between /status polls of one job
+        job_timeout: Seconds after which a job that has not finished is counted as timed out
+        agent_pid: Process to sample memory from (None to skip)
+    """
+
+    def __init__(self, agent_url, jobs, concurrency, status_interval, job_timeout, agent_pid=None):
+        self.agent_url = agent_url.rstrip("/")
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.status_interval = status_interval
+        self.job_timeout = job_timeout
+        self.agent_pid = agent_pid
+        self.start_latencies = []
+        self.status_latencies = []
+        self.job_latencies = []
+        self.outcomes = {"completed": 0, "failed": 0, "timed_out": 0, "error": 0}
+        self.rss_samples = []
+
+    async def run_job(self, client, index):
+        payload = {
+            "identifier_from_purchaser": f"bench{index:06d}{uuid.uuid4().hex[:8]}",
+            "input_data": {"text": f"Benchmark topic {index} {uuid.uuid4().hex}"},
+        }
+        job_start = time.perf_counter()
+        try:
+            response = await client.post(f"{self.agent_url}/start_job", json=payload)
+            self.start_latencies.append(time.perf_counter() - job_start)
+            response.raise_for_status()
+            job_id = response.json()["job_id"]
+
+            deadline = job_start + self.job_timeout
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(self.status_interval)
+                poll_start = time.perf_counter()
+                response = await client.get(f"{self.agent_url}/status", params={"job_id": job_id})
+                self.status_latencies.append(time.perf_counter() - poll_start)
+                response.raise_for_status()
+                status = response.json()["status"]
+                if status in ("completed", "failed"):
+                    self.outcomes[status] += 1
+                    if status == "completed":
+                        self.job_latencies.append(time.perf_counter() - job_start)
+                    return
+            self.outcomes["timed_out"] += 1
+        except (httpx.HTTPError, KeyError, ValueError):
+            self.outcomes["error"] += 1
+
+    async def sample_memory(self, stop):
+        while not stop.is_set():
+            rss = read_rss_kb(self.agent_pid)
+            if rss is not None:
+                self.rss_samples.append(rss)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.concurrency * 2, max_keepalive_connections=self.concurrency * 2)
+        async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+            await wait_until_ready(client, f"{self.agent_url}/availability")
+            stop_sampling = asyncio.Event()
+            sampler = asyncio.create_task(self.sample_memory(stop_sampling)) if self.agent_pid else None
+
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(index):
+                async with slots:
+                    await self.run_job(client, index)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(bounded(index) for index in range(self.jobs)))
+            elapsed = time.perf_counter() - started
+
+            stop_sampling.set()
+            if sampler is not None:
+                await sampler
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        report = {
+            "jobs": self.jobs,
+            "concurrency": self.concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_jobs_per_s": round(self.outcomes["completed"] / elapsed, 3) if elapsed else None,
+            "outcomes": self.outcomes,
+            "start_job": summarize(self.start_latencies),
+            "status": summarize(self.status_latencies),
+            "end_to_end": summarize(self.job_latencies),
+        }
+        if self.rss_samples:
+            report["memory"] = {
+                "rss_start_kb": self.rss_samples[0],
+                "rss_end_kb": self.rss_samples[-1],
+                "rss_peak_kb": max(self.rss_samples),
+                "rss_growth_kb": self.rss_samples[-1] - self.rss_samples[0],
+            }
+        return report
+
+
+def print_report(report):
+    print("\n" + "=" * 70)
+    print(f"Jobs: {report['jobs']}  concurrency: {report['concurrency']}  elapsed: {report['elapsed_s']}s")
+    print(f"Throughput: {report['throughput_jobs_per_s']} completed jobs/s  outcomes: {report['outcomes']}")
+    for name in ("start_job", "status", "end_to_end"):
+        stats = report[name]
+        if stats["count"]:
+            print(f"{name:<12} n={stats['count']:<6} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                  f"p99={stats['p99_ms']}ms max={stats['max_ms']}ms")
+    if "memory" in report:
+        memory = report["memory"]
+        print(f"Agent RSS: start={memory['rss_start_kb']} KiB end={memory['rss_end_kb']} KiB "
+              f"peak={memory['rss_peak_kb']} KiB growth={memory['rss_growth_kb']} KiB")
+    if "payment_service" in report:
+        service = report["payment_service"]
+        print(f"Payment service: {sum(service['requests'].values())} requests "
+              f"over {service['connections']} connections {service['requests']}")
+    print("=" * 70 + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100, help="Total jobs to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Jobs in flight at once")
+    parser.add_argument("--status-interval", type=float, default=0.5, help="Seconds between /status polls per job")
+    parser.add_argument("--job-timeout", type=float, default=300, help="Seconds before a job counts as timed out")
+    parser.add_argument("--confirm-delay", type=float, default=1.0, help="Fake payment confirmation delay in seconds")
+    parser.add_argument("--payment-latency", type=float, default=0.02, help="Fake payment service response latency")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency per completion in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes for the agent (API_WORKERS)")
+    parser.add_argument("--crew-workers", type=int, default=0,
+                        help="Separate `main.py worker` processes; when set, the API only serves requests")
+    parser.add_argument("--agent-url", help="Benchmark a running agent instead of starting one")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="Exit non-zero if end-to-end p99 exceeds this")
+    parser.add_argument("--max-rss-growth-kb", type=int, help="Exit non-zero if agent RSS grows more than this")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    processes = []
+    agent_pid = None
+    agent_url = args.agent_url
+    workdir = tempfile.mkdtemp(prefix="masumi-bench-")
+
+    try:
+        if agent_url is None:
+            payment_port, llm_port, agent_port = free_port(), free_port(), free_port()
+            env = dict(
+                os.environ,
+                BENCHMARK_LOG_DIR=workdir,
+                FAKE_CONFIRM_DELAY=str(args.confirm_delay),
+                FAKE_PAYMENT_LATENCY=str(args.payment_latency),
+                FAKE_LLM_LATENCY=str(args.llm_latency),
+            )
+            processes.append(start_fake("fake_masumi", payment_port, env))
+            processes.append(start_fake("fake_llm", llm_port, env))
+
+            agent_env = dict(
+                env,
+                API_PORT=str(agent_port),
+                API_HOST="127.0.0.1",
+                PAYMENT_SERVICE_URL=f"http://127.0.0.1:{payment_port}/api/v1",
+                PAYMENT_API_KEY="benchmark",
+                AGENT_IDENTIFIER="benchmark-agent",
+                SELLER_VKEY="benchmark-vkey",
+                NETWORK="Preprod",
+                OPENAI_API_KEY="benchmark",
+                LLM_BASE_URL=f"http://127.0.0.1:{llm_port}/v1",
+                JOB_STORE_PATH=os.path.join(workdir, "jobs.db"),
+                RESULT_CACHE_PATH=os.path.join(workdir, "result_cache.db"),
+                CLUSTER_DIR=os.path.join(workdir, "cluster"),
+                WORK_QUEUE_PATH=os.path.join(workdir, "work_queue.db"),
+                API_WORKERS=str(args.workers),
+                CREW_WORKERS="external" if args.crew_workers else "api",
+                PAYMENT_POLL_MIN_INTERVAL=os.getenv("PAYMENT_POLL_MIN_INTERVAL", "0.5"),
+            )
+            agent = start_process([sys.executable, "main.py", "api"], agent_env, os.path.join(workdir, "agent.log"))
+            processes.append(agent)
+            agent_pid = agent.pid
+            for number in range(args.crew_workers):
+                processes.append(start_process(
+                    [sys.executable, "main.py", "worker"], agent_env, os.path.join(workdir, f"worker-{number}.log")
+                ))
+            agent_url = f"http://127.0.0.1:{agent_port}"
+            print(f"Started fake payment service, fake LLM and agent; logs in {workdir}")
+
+        load_test = LoadTest(
+            agent_url,
+            jobs=args.jobs,
+            concurrency=args.concurrency,
+            status_interval=args.status_interval,
+            job_timeout=args.job_timeout,
+            agent_pid=agent_pid,
+        )
+        report = asyncio.run(load_test.run())
+        if args.agent_url is None:
+            # Requests per TCP connection shows whether the agent reuses its payment connections
+            service = httpx.get(f"http://127.0.0.1:{payment_port}/api/v1/health/", timeout=10).json()["data"]
+            report["payment_service"] = {"requests": service["requests"], "connections": service["connections"]}
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    failures = []
+    p99 = report["end_to_end"].get("p99_ms")
+    if args.max_p99_ms is not None and (p99 is None or p99 > args.max_p99_ms):
+        failures.append(f"end-to-end p99 {p99}ms exceeds {args.max_p99_ms}ms")
+    growth = report.get("memory", {}).get("rss_growth_kb")
+    if args.max_rss_growth_kb is not None and growth is not None and growth > args.max_rss_growth_kb:
+        failures.append(f"RSS growth {growth} KiB exceeds {args.max_rss_growth_kb} KiB")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures or report["outcomes"]["completed"] < args.jobs else 0)
+
+
+if __name__ == "__main__":
+    main()
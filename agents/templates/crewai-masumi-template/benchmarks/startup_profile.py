@@ -0,0 +1,176 @@
+"""
+Startup profile for the agent API
+
+Reports where the time goes before the agent can take jobs:
+
+1. An import-time breakdown of ``import main`` (``python -X importtime``),
+   as the slowest direct imports of main.py (cumulative) and the packages
+   with the most import time of their own.
+2. A cold start of ``python main.py api``: time until /availability first
+   answers and until it reports "available" (crew stack warmed up), with
+   the warm-up steps from /health.
+
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --top 30 --json startup.json --max-first-response-ms 1000
+
+No payment service is needed; the agent is started against a placeholder URL.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import httpx
+
+from loadtest import TEMPLATE_DIR, free_port, start_process
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output into (self_us, cumulative_us, depth, module) rows
+
+    Rows come in the order Python finishes the imports, so a module's own
+    imports are listed before it, one level deeper.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def summarize_imports(rows, module, top):
+    """Total time, the slowest direct imports of ``module`` and the slowest packages by own time"""
+    direct = []
+    pending = []
+    total_us = 0
+    for self_us, cumulative_us, depth, name in rows:
+        if depth == 0:
+            if name == module:
+                direct = pending
+                total_us = cumulative_us
+            pending = []
+        elif depth == 1:
+            pending.append((cumulative_us, name))
+    packages = {}
+    for self_us, _, _, name in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "direct_imports_ms": {name: round(us / 1000, 1) for us, name in sorted(direct, reverse=True)[:top]},
+        "packages_self_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def profile_imports(module, env, top):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=TEMPLATE_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return summarize_imports(parse_importtime(completed.stderr), module, top)
+
+
+def measure_cold_start(env, workdir, timeout):
+    """Start `main.py api` and time its first /availability answer and its readiness"""
+    port = free_port()
+    env = dict(env, API_PORT=str(port), API_HOST="127.0.0.1")
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    agent = start_process([sys.executable, "main.py", "api"], env, os.path.join(workdir, "agent.log"))
+    first_response = ready = None
+    health = None
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    status = client.get(f"{url}/availability").json().get("status")
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+                    continue
+                now = time.perf_counter() - started
+                first_response = first_response if first_response is not None else now
+                if status == "available":
+                    ready = now
+                    health = client.get(f"{url}/health").json()
+                    break
+                time.sleep(0.01)
+    finally:
+        agent.terminate()
+        try:
+            agent.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            agent.kill()
+    return {
+        "first_response_ms": round(first_response * 1000, 1) if first_response is not None else None,
+        "ready_ms": round(ready * 1000, 1) if ready is not None else None,
+        "warm_up": (health or {}).get("warm_up"),
+    }
+
+
+def print_report(report):
+    imports = report["imports"]
+    print("\n" + "=" * 70)
+    print(f"import {imports['module']}: {imports['total_ms']} ms")
+    print("\nSlowest direct imports (cumulative ms):")
+    for name, ms in imports["direct_imports_ms"].items():
+        print(f"  {name:<50} {ms:>10}")
+    print("\nPackages by own import time (ms):")
+    for name, ms in imports["packages_self_ms"].items():
+        print(f"  {name:<50} {ms:>10}")
+    cold = report.get("cold_start")
+    if cold is not None:
+        print(f"\nCold start: first response {cold['first_response_ms']} ms, ready {cold['ready_ms']} ms")
+        if cold["warm_up"]:
+            print(f"Warm-up steps (s): {cold['warm_up'].get('steps')}")
+    print("=" * 70 + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main", help="Module whose import is profiled")
+    parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    parser.add_argument("--skip-cold-start", action="store_true", help="Only profile imports")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for readiness")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    parser.add_argument("--max-first-response-ms", type=float, help="Exit non-zero if the first response is slower")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="masumi-startup-")
+    env = dict(
+        os.environ,
+        PAYMENT_SERVICE_URL=os.getenv("PAYMENT_SERVICE_URL", "http://127.0.0.1:9/api/v1"),
+        PAYMENT_API_KEY=os.getenv("PAYMENT_API_KEY", "startup-profile"),
+        JOB_STORE_PATH=os.path.join(workdir, "jobs.db"),
+        WORK_QUEUE_PATH=os.path.join(workdir, "work_queue.db"),
+        RESULT_CACHE_PATH=os.path.join(workdir, "result_cache.db"),
+        CLUSTER_DIR=os.path.join(workdir, "cluster"),
+    )
+    report = {"imports": profile_imports(args.module, env, args.top)}
+    if not args.skip_cold_start:
+        report["cold_start"] = measure_cold_start(env, workdir, args.timeout)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    first_response = (report.get("cold_start") or {}).get("first_response_ms")
+    if args.max_first_response_ms is not None and (first_response is None or first_response > args.max_first_response_ms):
+        sys.exit(f"First response took {first_response} ms (limit {args.max_first_response_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Token-efficiency benchmark for crew definitions
+
+Runs a crew over a fixed corpus of inputs with a recording fake LLM in place
+of the real model and reports, per task, how many LLM calls were made, how
+many prompt and completion tokens they used and how long they would have
+taken at a simulated latency. No network access or API key is needed.
+
+    python benchmarks/token_benchmark.py
+    python benchmarks/token_benchmark.py --json after.json --baseline before.json
+
+A crew definition is given as "module:factory"; the factory is called with
+``llm=<fake LLM>`` and must return an object with ``kickoff(inputs, listener=...)``
+that reports task_started events, like ResearchCrew does.
+"""
+import os
+import sys
+import json
+import argparse
+import importlib
+import threading
+from crewai import BaseLLM
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from prompt_prefix import count_tokens, prefix_stats
+
+
+def _messages_text(messages):
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+class RecordingLLM(BaseLLM):
+    """
+    Fake LLM that answers every call immediately and records its cost
+
+    Args:
+        completion_tokens: Approximate length of each answer in tokens
+        latency_base: Simulated seconds per call
+        latency_per_token: Simulated seconds per completion token
+    """
+
+    def __init__(self, completion_tokens=150, latency_base=0.4, latency_per_token=0.01, model="recording-fake"):
+        super().__init__(model=model)
+        self.completion_tokens = completion_tokens
+        self.latency_base = latency_base
+        self.latency_per_token = latency_per_token
+        self.current_task = None
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        prompt_tokens = count_tokens(_messages_text(messages))
+        answer = "Thought: I now can give a great answer\nFinal Answer: " + " ".join(["data"] * self.completion_tokens)
+        completion_tokens = count_tokens(answer)
+        with self._lock:
+            self.calls.append({
+                "task": self.current_task,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency_s": self.latency_base + self.latency_per_token * completion_tokens,
+            })
+        return answer
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 128000
+
+    def listener(self, event, task=None, agent=None, **_details):
+        """Crew progress listener that attributes later calls to the running task"""
+        if event == "task_started":
+            self.current_task = f"{task}:{agent}"
+
+
+def load_factory(spec):
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "ResearchCrew")
+
+
+def run_benchmark(factory, corpus, llm_options):
+    """
+    Run every corpus input through a fresh crew and aggregate the recorded calls
+
+    Returns:
+        A report dict with per-task and per-job totals
+    """
+    tasks = {}
+    jobs = []
+    for text in corpus:
+        llm = RecordingLLM(**llm_options)
+        crew = factory(llm=llm, verbose=False)
+        crew.kickoff({"text": text}, listener=llm.listener)
+        job = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0}
+        for call in llm.calls:
+            task = tasks.setdefault(call["task"], {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0})
+            for totals in (task, job):
+                totals["calls"] += 1
+                totals["prompt_tokens"] += call["prompt_tokens"]
+                totals["completion_tokens"] += call["completion_tokens"]
+                totals["latency_s"] += call["latency_s"]
+        jobs.append(job)
+
+    count = len(jobs) or 1
+    per_job = {key: round(sum(job[key] for job in jobs) / count, 3) for key in ("calls", "prompt_tokens", "completion_tokens", "latency_s")}
+    per_job["total_tokens"] = round(per_job["prompt_tokens"] + per_job["completion_tokens"], 3)
+    per_task = {
+        name: {key: round(value / count, 3) for key, value in totals.items()}
+        for name, totals in sorted(tasks.items(), key=lambda item: str(item[0]))
+    }
+    return {"inputs": len(jobs), "per_job": per_job, "per_task": per_task}
+
+
+def print_report(report, baseline=None):
+    print("\n" + "=" * 70)
+    print(f"Averages over {report['inputs']} inputs (latency is simulated)")
+    print(f"{'task':<32} {'calls':>6} {'prompt':>9} {'completion':>11} {'latency_s':>10}")
+    for name, totals in report["per_task"].items():
+        print(f"{str(name):<32} {totals['calls']:>6} {totals['prompt_tokens']:>9} "
+              f"{totals['completion_tokens']:>11} {totals['latency_s']:>10}")
+    job = report["per_job"]
+    print(f"{'per job':<32} {job['calls']:>6} {job['prompt_tokens']:>9} "
+          f"{job['completion_tokens']:>11} {job['latency_s']:>10}")
+    for role, prefix in report.get("prompt_prefix", {}).items():
+        cacheable = "provider-cacheable" if prefix["provider_cacheable"] else "below provider cache minimum"
+        print(f"Static prefix for {role}: {prefix['tokens']} tokens ({cacheable})")
+    if baseline is not None:
+        print("\nChange against baseline (per job):")
+        for key in ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "latency_s"):
+            before, after = baseline["per_job"].get(key), job[key]
+            if before:
+                print(f"  {key:<18} {before} -> {after} ({(after - before) / before * 100:+.1f}%)")
+    print("=" * 70 + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--crew", default="crew_definition:ResearchCrew", help="Crew factory as module:attribute")
+    parser.add_argument("--corpus", default=os.path.join(BENCHMARK_DIR, "corpus.json"), help="JSON list of input texts")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Approximate tokens per fake answer")
+    parser.add_argument("--latency-base", type=float, default=0.4, help="Simulated seconds per LLM call")
+    parser.add_argument("--latency-per-token", type=float, default=0.01, help="Simulated seconds per completion token")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(args.corpus) as corpus_file:
+        corpus = json.load(corpus_file)
+    report = run_benchmark(
+        load_factory(args.crew),
+        corpus,
+        {
+            "completion_tokens": args.completion_tokens,
+            "latency_base": args.latency_base,
+            "latency_per_token": args.latency_per_token,
+        },
+    )
+    report["crew"] = args.crew
+    report["prompt_prefix"] = prefix_stats()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+    if args.json_path:
+        with open(args.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import asyncio
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class FileLock:
+    """
+    Exclusive lock on a file (fcntl.flock)
+
+    ``try_acquire`` gives up at once if another process holds the lock; used
+    as a context manager it waits for it instead.
+
+    The operating system drops the lock when the holding process exits, even
+    if it crashes, so a lock can never be left behind by a dead worker.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._handle = None
+
+    @property
+    def held(self):
+        return self._handle is not None
+
+    def try_acquire(self, blocking=False):
+        """
+        Take the lock if it is free; returns whether this process holds it
+
+        Args:
+            blocking: Wait for another process to release the lock instead
+                of giving up
+        """
+        import fcntl
+        if self._handle is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handle = handle
+        return True
+
+    def __enter__(self):
+        self.try_acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def release(self):
+        if self._handle is not None:
+            import fcntl
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+
+
+class LeaderElection:
+    """
+    Elects one worker on the host to run singleton background work
+
+    Every worker keeps trying to take a file lock; the one holding it is the
+    leader until it exits, after which another worker takes over within
+    ``retry_interval`` seconds. A leader whose ``on_elected`` raises releases
+    the lock and stands for election again, so a failure never leaves the
+    host without a leader.
+    """
+
+    def __init__(self, path, on_elected, retry_interval=2.0):
+        """
+        Args:
+            path: Lock file shared by all workers
+            on_elected: Async callable run each time this worker becomes leader;
+                it should undo its own work before raising
+            retry_interval: Seconds between attempts while another worker leads
+        """
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self._lock = FileLock(path)
+        self._task = None
+
+    @property
+    def is_leader(self):
+        return self._lock.held
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            while not self._lock.try_acquire():
+                await asyncio.sleep(self.retry_interval)
+            logger.info(f"Worker {os.getpid()} elected leader")
+            try:
+                await self.on_elected()
+                return
+            except Exception as e:
+                logger.error(f"Leader work failed on worker {os.getpid()}, stepping down: {str(e)}", exc_info=True)
+            self._lock.release()
+            # Give the other workers a chance to take over first
+            await asyncio.sleep(self.retry_interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._lock.release()
@@ -1,56 +1,347 @@
+import os
+import re
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from crewai import Agent, Crew, Task
 from crewai import LLM
 from logging_config import get_logger
+from crew_pool import CrewPool
+from knowledge_index import get_knowledge_index
+from llm_cache import with_response_cache
+from prompt_prefix import static_backstory_from_env, static_prefix_digest_from_env
+from model_router import RoutingLLM, get_model_router
 
 class ResearchCrew:
-    def __init__(self, verbose=True, logger=None, model=None, temperature=None):
+    # (role, goal, backstory) of each agent
+    RESEARCHER = ('Research Analyst', 'Find and analyze key information', 'Expert at extracting information')
+    WRITER = ('Content Summarizer', 'Create clear summaries from research', 'Skilled at transforming complex information')
+
+    def __init__(self, verbose=True, logger=None, model=None, temperature=None, llm=None):
         self.verbose = verbose
         self.logger = logger or get_logger(__name__)
-        # Configure LLM - support custom model and temperature, default to gpt-5-nano
-        if model:
-            llm_params = {"model": model}
-            if temperature is not None:
-                llm_params["temperature"] = temperature
-            self.llm = LLM(**llm_params)
+        router = get_model_router() if llm is None else None
+        if router is not None:
+            # Each task picks its model per call from LLM_ROUTE_* (see model_router.py);
+            # a task without a route list of its own or a default uses the plain LLM
+            timeout_env = os.getenv("LLM_ROUTE_CALL_TIMEOUT")
+            timeout = float(timeout_env) if timeout_env else None
+            build = lambda routed_model: self._build_llm(routed_model, temperature, timeout=timeout)
+            plain_llm = None
+            task_llms = {}
+            for task in ("researcher", "writer"):
+                if router.routes_for(task):
+                    task_llms[task] = RoutingLLM(router, task, build)
+                else:
+                    plain_llm = plain_llm or self._build_llm(model, temperature)
+                    task_llms[task] = plain_llm
+            self.researcher_llm = task_llms["researcher"]
+            self.writer_llm = task_llms["writer"]
+            self.llm = self.researcher_llm
         else:
-            self.llm = LLM(model="gpt-5-nano")
+            self.llm = llm or self._build_llm(model, temperature)
+            self.researcher_llm = self.writer_llm = self.llm
+        # Optional fan-out: split broad inputs into sub-questions researched concurrently
+        self.fanout = os.getenv("CREW_FANOUT", "false").lower() in ("1", "true", "yes")
+        self.fanout_max_questions = int(os.getenv("CREW_FANOUT_MAX_QUESTIONS", "4"))
+        self.fanout_concurrency = int(os.getenv("CREW_FANOUT_CONCURRENCY", "3"))
+        # Per-run progress listener, set by kickoff()
+        self.listener = None
+        self._task_index = 0
+        self.last_timings = None
         self.crew = self.create_crew()
         self.logger.info("ResearchCrew initialized")
 
-    def create_crew(self):
-        self.logger.info("Creating research crew with agents")
-        
-        researcher = Agent(
-            role='Research Analyst',
-            goal='Find and analyze key information',
-            backstory='Expert at extracting information',
-            llm=self.llm,
+    @staticmethod
+    def _build_llm(model, temperature, timeout=None):
+        # Configure LLM - support custom model and temperature, default to gpt-5-nano
+        llm_params = {"model": model or "gpt-5-nano"}
+        if model and temperature is not None:
+            llm_params["temperature"] = temperature
+        if timeout is not None:
+            llm_params["timeout"] = timeout
+        # Optional OpenAI-compatible endpoint, e.g. a local stand-in for benchmarks
+        base_url = os.getenv("LLM_BASE_URL")
+        if base_url:
+            llm_params["base_url"] = base_url
+        # Identical requests are answered from disk when LLM_CACHE_ENABLED is set
+        return with_response_cache(LLM(**llm_params))
+
+    def _research_tools(self):
+        # Ground the researcher in the local knowledgebase when one is indexed
+        index = get_knowledge_index()
+        if index is None:
+            return []
+        from knowledge_tool import KnowledgeSearchTool
+        return [KnowledgeSearchTool(index=index, top_k=int(os.getenv("KNOWLEDGE_TOP_K", "4")))]
+
+    # Persona and pinned knowledge live in the backstory, so each agent's
+    # system prompt is a static prefix and only the task carries {text}
+    def _make_researcher(self):
+        role, goal, backstory = self.RESEARCHER
+        return Agent(
+            role=role,
+            goal=goal,
+            backstory=static_backstory_from_env(role, goal, backstory),
+            llm=self.researcher_llm,
+            tools=self._research_tools(),
             verbose=self.verbose
         )
 
-        writer = Agent(
-            role='Content Summarizer',
-            goal='Create clear summaries from research',
-            backstory='Skilled at transforming complex information',
+    def _make_writer(self):
+        role, goal, backstory = self.WRITER
+        return Agent(
+            role=role,
+            goal=goal,
+            backstory=static_backstory_from_env(role, goal, backstory),
+            llm=self.writer_llm,
             verbose=self.verbose
         )
 
+    def create_crew(self):
+        self.logger.info("Creating research crew with agents")
+        
+        researcher = self._make_researcher()
+        writer = self._make_writer()
+
         self.logger.info("Created research and writer agents")
 
+        research_task = Task(
+            description='Research: {text}',
+            expected_output='Detailed research findings about the topic',
+            agent=researcher
+        )
+        summary_task = Task(
+            description='Write summary',
+            expected_output='Clear and concise summary of the research findings',
+            agent=writer,
+            context=[research_task]
+        )
+
         crew = Crew(
             agents=[researcher, writer],
-            tasks=[
-                Task(
-                    description='Research: {text}',
-                    expected_output='Detailed research findings about the topic',
-                    agent=researcher
-                ),
-                Task(
-                    description='Write summary',
-                    expected_output='Clear and concise summary of the research findings',
-                    agent=writer
-                )
-            ]
+            tasks=[research_task, summary_task],
+            step_callback=self._on_step,
+            task_callback=self._on_task_finished
         )
         self.logger.info("Crew setup completed")
-        return crew
\ No newline at end of file
+        return crew
+
+    def kickoff(self, inputs, listener=None, deadline=None):
+        """
+        Run the crew, reporting progress to ``listener``
+
+        Args:
+            inputs: Crew inputs, e.g. {"text": ...}
+            listener: Optional callable(event, **details) receiving
+                task_started, task_step and task_finished events
+            deadline: Optional time.time() by which the job should finish;
+                routed LLMs avoid models too slow to make it
+        """
+        self.listener = listener
+        self._task_index = 0
+        self._set_deadline(deadline)
+        try:
+            questions = split_subquestions(inputs.get("text"), self.fanout_max_questions) if self.fanout else []
+            if len(questions) > 1:
+                return self._kickoff_fanout(inputs.get("text"), questions)
+            start = time.perf_counter()
+            self._emit_task_event("task_started", 0)
+            result = self.crew.kickoff(inputs)
+            self.last_timings = {"mode": "sequential", "wall_seconds": round(time.perf_counter() - start, 3)}
+            return result
+        finally:
+            self.listener = None
+            self._set_deadline(None)
+
+    def _kickoff_fanout(self, text, questions):
+        """
+        Research each sub-question in its own single-task crew, at most
+        ``fanout_concurrency`` at a time, then let the writer merge the findings
+        """
+        start = time.perf_counter()
+        research_seconds = [0.0] * len(questions)
+
+        def research(index, question):
+            # Agents keep per-execution state, so every concurrent task gets its own
+            researcher = self._make_researcher()
+            task_start = time.perf_counter()
+            self._emit("task_started", task=index, agent=researcher.role)
+            crew = Crew(
+                agents=[researcher],
+                tasks=[Task(
+                    description='Research this part of the request: {question}\n\nFull request for context: {text}',
+                    expected_output='Detailed research findings about this part of the request',
+                    agent=researcher
+                )],
+                step_callback=lambda _step: self._emit("task_step", task=index, agent=researcher.role)
+            )
+            output = crew.kickoff({"question": question, "text": text})
+            research_seconds[index] = time.perf_counter() - task_start
+            self._emit("task_finished", task=index, agent=researcher.role)
+            return output.raw if hasattr(output, "raw") else str(output)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.fanout_concurrency), thread_name_prefix="crew-fanout") as pool:
+            findings = list(pool.map(research, range(len(questions)), questions))
+        fanout_seconds = time.perf_counter() - start
+
+        writer = self._make_writer()
+        merge_index = len(questions)
+        merge_start = time.perf_counter()
+        self._emit("task_started", task=merge_index, agent=writer.role)
+        result = Crew(
+            agents=[writer],
+            tasks=[Task(
+                description='Merge the research findings below into one summary answering: {text}\n\n{findings}',
+                expected_output='Clear and concise summary of the research findings',
+                agent=writer
+            )],
+            step_callback=lambda _step: self._emit("task_step", task=merge_index, agent=writer.role)
+        ).kickoff({
+            "text": text,
+            "findings": "\n\n".join(f"## {question}\n{finding}" for question, finding in zip(questions, findings))
+        })
+        merge_seconds = time.perf_counter() - merge_start
+        self._emit("task_finished", task=merge_index, agent=writer.role)
+
+        wall_seconds = time.perf_counter() - start
+        sequential_seconds = sum(research_seconds) + merge_seconds
+        self.last_timings = {
+            "mode": "fanout",
+            "questions": len(questions),
+            "research_seconds": [round(seconds, 3) for seconds in research_seconds],
+            "fanout_seconds": round(fanout_seconds, 3),
+            "merge_seconds": round(merge_seconds, 3),
+            "wall_seconds": round(wall_seconds, 3),
+            "sequential_seconds": round(sequential_seconds, 3),
+            "saved_seconds": round(sequential_seconds - wall_seconds, 3),
+        }
+        self.logger.info(f"Fan-out research finished: {self.last_timings}")
+        self._emit("crew_timing", **self.last_timings)
+        return result
+
+    def _set_deadline(self, deadline):
+        for llm in (self.researcher_llm, self.writer_llm):
+            if isinstance(llm, RoutingLLM):
+                llm.deadline = deadline
+
+    def _emit(self, event, **details):
+        if self.listener is None:
+            return
+        try:
+            self.listener(event, **details)
+        except Exception as e:
+            self.logger.warning(f"Crew progress listener failed: {str(e)}")
+
+    def _emit_task_event(self, event, index, **details):
+        if index >= len(self.crew.tasks):
+            return
+        self._emit(event, task=index, agent=self.crew.tasks[index].agent.role, **details)
+
+    def _on_step(self, _step_output):
+        self._emit_task_event("task_step", self._task_index)
+
+    def _on_task_finished(self, _task_output):
+        self._emit_task_event("task_finished", self._task_index)
+        self._task_index += 1
+        self._emit_task_event("task_started", self._task_index)
+
+    def reset(self):
+        """Clear per-run state so the crew can be reused for the next job"""
+        self.listener = None
+        self._task_index = 0
+        self._set_deadline(None)
+        for task in self.crew.tasks:
+            task.output = None
+
+
+def split_subquestions(text, max_questions=4):
+    """
+    Split a broad request into up to ``max_questions`` sub-questions
+
+    List items and separate lines are taken as they are; otherwise the text
+    is split into sentences, which are grouped evenly when there are more
+    than ``max_questions``. Returns fewer than two items when the request
+    does not break up, in which case the crew runs sequentially.
+    """
+    if isinstance(text, dict):
+        text = "\n".join(str(value) for value in text.values())
+    if not isinstance(text, str):
+        return []
+    lines = [re.sub(r"^\s*(?:[-*\u2022]|\d+[.)])\s*", "", line).strip() for line in text.splitlines()]
+    parts = [line for line in lines if len(line.split()) >= 2]
+    if len(parts) < 2:
+        parts = [sentence.strip() for sentence in re.split(r"(?<=[.?!])\s+", text) if len(sentence.split()) >= 3]
+    if len(parts) < 2:
+        return []
+    groups = min(max_questions, len(parts))
+    bounds = [index * len(parts) // groups for index in range(groups + 1)]
+    return [" ".join(parts[bounds[index]:bounds[index + 1]]) for index in range(groups)]
+
+
+# Bump when the agents, tasks or prompts above change, so cached results of
+# the previous crew are no longer served
+CREW_VERSION = 1
+
+
+def crew_config_fingerprint(model=None, temperature=None):
+    """
+    Digest of everything besides the input that shapes a ResearchCrew's answer
+
+    Covers the crew version, the model and temperature (or the LLM_ROUTE_*
+    routes), the fan-out settings, the agents' static prompt prefixes
+    (persona and pinned files included) and the knowledge index contents.
+    Results cached or shared under one fingerprint are not reused once any
+    of these change.
+    """
+    router = get_model_router()
+    index = get_knowledge_index()
+    config = {
+        "crew": f"ResearchCrew/{CREW_VERSION}",
+        "llm": {"model": model, "temperature": temperature, "base_url": os.getenv("LLM_BASE_URL")},
+        "routes": {
+            task: [(route.model, route.max_input_chars) for route in routes]
+            for task, routes in router.routes.items()
+        } if router is not None else None,
+        "fanout": [
+            os.getenv("CREW_FANOUT", "false").lower() in ("1", "true", "yes"),
+            int(os.getenv("CREW_FANOUT_MAX_QUESTIONS", "4")),
+        ],
+        "prompts": [
+            static_prefix_digest_from_env(*profile) for profile in (ResearchCrew.RESEARCHER, ResearchCrew.WRITER)
+        ],
+        "knowledge": [index.meta.get("fingerprint"), int(os.getenv("KNOWLEDGE_TOP_K", "4"))] if index is not None else None,
+    }
+    encoded = json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# One pool per process; worker processes each build their own
+crew_pool = CrewPool.from_env(lambda model, temperature: ResearchCrew(model=model, temperature=temperature))
+
+
+def kickoff_research_crew(text, model=None, temperature=None, listener=None, deadline=None):
+    """
+    Run a pooled ResearchCrew on ``text``
+
+    Module-level so the crew executor can ship it to a worker thread or process.
+
+    Args:
+        text: The purchaser's input text
+        model: Optional LLM model name
+        temperature: Optional LLM temperature
+        listener: Optional progress callable(event, **details) (thread mode only)
+        deadline: Optional time.time() by which the job should finish
+
+    Returns:
+        The crew output (the raw string when running in a worker process)
+    """
+    with crew_pool.lease((model, temperature)) as crew:
+        return crew.kickoff({"text": text}, listener=listener, deadline=deadline)
+
+
+def kickoff_research_crew_raw(text, model=None, temperature=None, deadline=None):
+    """Process-pool variant of kickoff_research_crew that returns a picklable string"""
+    result = kickoff_research_crew(text, model=model, temperature=temperature, deadline=deadline)
+    return result.raw if hasattr(result, "raw") else str(result)
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class CrewPool:
+    """
+    Thread-safe pool of ready-to-run crews keyed by their LLM configuration.
+
+    A crew is leased exclusively for one kickoff and returned afterwards, so
+    its LLM client, agents and tasks are built once and reused by later jobs.
+    At most ``max_idle_per_key`` idle crews are kept per key, at most
+    ``max_keys`` keys are kept overall (least recently used key goes first),
+    and crews idle for longer than ``idle_timeout`` seconds are dropped.
+    """
+
+    def __init__(self, factory, max_idle_per_key=4, max_keys=8, idle_timeout=600.0):
+        """
+        Args:
+            factory: Callable(*key) that builds a new crew
+            max_idle_per_key: Idle crews retained per key
+            max_keys: Distinct keys retained
+            idle_timeout: Seconds an idle crew may wait before eviction
+        """
+        self.factory = factory
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # key -> list of (crew, released_at); dict order tracks key recency
+        self._idle = {}
+        self._counters = {"created": 0, "reused": 0, "evicted": 0, "leased": 0}
+
+    @classmethod
+    def from_env(cls, factory):
+        """Build a pool from CREW_POOL_SIZE, CREW_POOL_MAX_KEYS and CREW_POOL_IDLE_SECONDS"""
+        return cls(
+            factory,
+            max_idle_per_key=int(os.getenv("CREW_POOL_SIZE", "4")),
+            max_keys=int(os.getenv("CREW_POOL_MAX_KEYS", "8")),
+            idle_timeout=float(os.getenv("CREW_POOL_IDLE_SECONDS", "600")),
+        )
+
+    def acquire(self, key):
+        """Take an idle crew for ``key`` or build a new one"""
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+            idle = self._idle.pop(key, [])
+            crew = idle.pop()[0] if idle else None
+            if idle:
+                self._idle[key] = idle
+            self._counters["leased"] += 1
+            if crew is not None:
+                self._counters["reused"] += 1
+        if crew is None:
+            crew = self.factory(*key)
+            with self._lock:
+                self._counters["created"] += 1
+            logger.info(f"Created pooled crew for {key}")
+        return crew
+
+    def release(self, key, crew):
+        """Reset a crew and return it to the pool"""
+        with self._lock:
+            self._counters["leased"] -= 1
+        try:
+            crew.reset()
+        except Exception as e:
+            logger.warning(f"Discarding crew for {key} that failed to reset: {str(e)}")
+            return
+        with self._lock:
+            idle = self._idle.pop(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append((crew, time.monotonic()))
+            else:
+                self._counters["evicted"] += 1
+            self._idle[key] = idle
+            while len(self._idle) > self.max_keys:
+                oldest_key = next(iter(self._idle))
+                self._counters["evicted"] += len(self._idle.pop(oldest_key))
+
+    def warm(self, key, count=1):
+        """Build up to ``count`` idle crews for ``key`` ahead of the first job"""
+        crews = [self.acquire(key) for _ in range(count)]
+        for crew in crews:
+            self.release(key, crew)
+
+    @contextmanager
+    def lease(self, key):
+        """Context manager around acquire/release"""
+        crew = self.acquire(key)
+        try:
+            yield crew
+        finally:
+            self.release(key, crew)
+
+    def _evict_idle_locked(self, now):
+        for key in list(self._idle):
+            fresh = [(crew, t) for crew, t in self._idle[key] if now - t < self.idle_timeout]
+            self._counters["evicted"] += len(self._idle[key]) - len(fresh)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+    def evict_idle(self):
+        """Drop crews that have been idle longer than ``idle_timeout``"""
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["idle"] = sum(len(idle) for idle in self._idle.values())
+            stats["keys"] = len(self._idle)
+        return stats
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from logging_config import get_logger, setup_worker_logging
+
+logger = get_logger(__name__)
+
+
+class CrewTimeoutError(Exception):
+    """Raised when a crew run exceeds its per-job timeout"""
+
+
+class CrewCancelledError(Exception):
+    """Raised when a crew run is cancelled before it produced a result"""
+
+
+class CrewExecutor:
+    """
+    Bounded worker pool that runs blocking crew kickoffs off the event loop.
+
+    At most ``max_workers`` jobs are handed to the underlying pool at once;
+    everything else waits in an asyncio queue so it can still be cancelled
+    cheaply. A job that times out or is cancelled while running keeps its
+    worker slot until the pool thread/process actually returns, so the pool
+    never runs more than ``max_workers`` crews at the same time.
+    """
+
+    def __init__(self, max_workers=4, mode="thread", job_timeout=None):
+        """
+        Args:
+            max_workers: Number of crews that may run concurrently
+            mode: "thread" or "process"
+            job_timeout: Default per-job timeout in seconds (None = no timeout)
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.max_workers = max_workers
+        self.mode = mode
+        self.job_timeout = job_timeout
+        if mode == "process":
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=setup_worker_logging)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-worker")
+        self._slots = None
+        self.closed = False
+        self._lock = threading.Lock()
+        self._cancel_requests = {}
+        self._counters = {
+            "queued": 0,
+            "running": 0,
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build an executor from CREW_EXECUTOR, CREW_MAX_WORKERS and CREW_JOB_TIMEOUT"""
+        timeout_env = os.getenv("CREW_JOB_TIMEOUT")
+        return cls(
+            max_workers=int(os.getenv("CREW_MAX_WORKERS", "4")),
+            mode=os.getenv("CREW_EXECUTOR", "thread"),
+            job_timeout=float(timeout_env) if timeout_env else None,
+        )
+
+    def _incr(self, name, delta=1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def _abandon_slot(self, acquire):
+        """Give up a pending slot acquisition, releasing the slot if it was already granted"""
+        if acquire.done():
+            if not acquire.cancelled() and acquire.exception() is None:
+                self._slots.release()
+        else:
+            acquire.cancel()
+
+    def _release_slot(self, _future):
+        self._incr("running", -1)
+        self._slots.release()
+
+    async def submit(self, job_id, fn, *args, timeout=None):
+        """
+        Run ``fn(*args)`` in the pool and wait for its result
+
+        Args:
+            job_id: Identifier used for cancellation and logging
+            fn: Blocking callable (must be picklable in process mode)
+            timeout: Per-job timeout in seconds, overrides the default
+
+        Returns:
+            Whatever ``fn`` returns
+
+        Raises:
+            CrewTimeoutError: If the job did not finish within the timeout
+            CrewCancelledError: If ``cancel(job_id)`` was called first
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        timeout = timeout if timeout is not None else self.job_timeout
+        cancel_future = loop.create_future()
+        self._cancel_requests[job_id] = cancel_future
+        self._incr("submitted")
+        self._incr("queued")
+        logger.info(f"Queued crew job {job_id} ({self.stats()['queued']} waiting)")
+
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            done, _ = await asyncio.wait({acquire, cancel_future}, return_when=asyncio.FIRST_COMPLETED)
+            if acquire not in done:
+                self._abandon_slot(acquire)
+                self._cancel_requests.pop(job_id, None)
+                self._incr("cancelled")
+                raise CrewCancelledError(f"Crew job {job_id} cancelled while queued")
+        except asyncio.CancelledError:
+            # The caller went away while queued: the slot must not be lost
+            self._abandon_slot(acquire)
+            self._cancel_requests.pop(job_id, None)
+            raise
+        finally:
+            self._incr("queued", -1)
+
+        self._incr("running")
+        if self.mode == "thread":
+            # Carry the caller's contextvars (e.g. the log context) into the worker thread
+            pool_future = loop.run_in_executor(self._pool, contextvars.copy_context().run, fn, *args)
+        else:
+            pool_future = loop.run_in_executor(self._pool, fn, *args)
+        pool_future.add_done_callback(self._release_slot)
+        try:
+            done, _ = await asyncio.wait(
+                {pool_future, cancel_future}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if pool_future in done:
+                try:
+                    result = pool_future.result()
+                except Exception:
+                    self._incr("failed")
+                    raise
+                self._incr("completed")
+                return result
+            if cancel_future in done:
+                self._incr("cancelled")
+                logger.warning(f"Crew job {job_id} cancelled while running; worker slot held until it returns")
+                raise CrewCancelledError(f"Crew job {job_id} cancelled")
+            self._incr("timed_out")
+            logger.warning(f"Crew job {job_id} timed out after {timeout}s; worker slot held until it returns")
+            raise CrewTimeoutError(f"Crew job {job_id} timed out after {timeout}s")
+        finally:
+            self._cancel_requests.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """
+        Request cancellation of a queued or running job
+
+        Returns:
+            True if the job was known and not already finished
+        """
+        cancel_future = self._cancel_requests.get(job_id)
+        if cancel_future is None or cancel_future.done():
+            return False
+        cancel_future.set_result(True)
+        logger.info(f"Cancellation requested for crew job {job_id}")
+        return True
+
+    def stats(self):
+        """Return queue depth, utilisation and lifetime counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["mode"] = self.mode
+        stats["max_workers"] = self.max_workers
+        stats["utilisation"] = round(stats["running"] / self.max_workers, 3) if self.max_workers else 0.0
+        return stats
+
+    def shutdown(self):
+        """Cancel all outstanding jobs and stop the pool"""
+        self.closed = True
+        for job_id in list(self._cancel_requests):
+            self.cancel(job_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
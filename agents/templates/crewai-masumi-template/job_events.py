@@ -0,0 +1,61 @@
+import time
+import asyncio
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class JobEventBus:
+    """
+    In-process fan-out of job lifecycle events to stream subscribers.
+
+    Only jobs with at least one live subscriber hold any state, so publishing
+    for unwatched jobs is a dictionary miss. ``publish_threadsafe`` lets crew
+    callbacks running in executor threads hand events back to the loop.
+    """
+
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._loop = None
+
+    def bind_loop(self, loop):
+        """Remember the event loop that owns the subscriber queues"""
+        self._loop = loop
+
+    def subscribe(self, job_id):
+        """Return a queue that receives every event published for ``job_id``"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def publish(self, job_id, event, **details):
+        """Deliver an event to every subscriber of ``job_id`` (loop thread only)"""
+        queues = self._subscribers.get(job_id)
+        if not queues:
+            return
+        message = {"job_id": job_id, "event": event, "timestamp": time.time(), **details}
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning(f"Dropping {event} event for slow subscriber of job {job_id}")
+
+    def publish_threadsafe(self, job_id, event, **details):
+        """Like publish, but callable from any thread"""
+        if self._loop is None or job_id not in self._subscribers:
+            return
+        self._loop.call_soon_threadsafe(lambda: self.publish(job_id, event, **details))
+
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
@@ -0,0 +1,420 @@
+import os
+import sys
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from enum import Enum
+from dataclasses import dataclass
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+JOB_FIELDS = (
+    "job_id",
+    "status",
+    "payment_status",
+    "blockchain_identifier",
+    "identifier_from_purchaser",
+    "input_data",
+    "result",
+    "error",
+    "worker",
+    "created_at",
+    "updated_at",
+)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# What the payment poller needs to watch a job, without its input or result
+TRACKING_FIELDS = ("job_id", "blockchain_identifier", "identifier_from_purchaser", "created_at")
+
+
+class JobStatus(str, Enum):
+    AWAITING_PAYMENT = "awaiting_payment"
+    # Payment confirmed, waiting in the work queue for a crew worker
+    PAID = "paid"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class PaymentStatus(str, Enum):
+    """Our own payment states plus the Masumi on-chain states reported by the poller"""
+    PENDING = "pending"
+    COMPLETED = "completed"
+    # Not paid before the poller gave up on it
+    EXPIRED = "expired"
+    FUNDS_LOCKED = "FundsLocked"
+    FUNDS_OR_DATUM_INVALID = "FundsOrDatumInvalid"
+    RESULT_SUBMITTED = "ResultSubmitted"
+    REFUND_REQUESTED = "RefundRequested"
+    DISPUTED = "Disputed"
+    WITHDRAWN = "Withdrawn"
+    REFUND_WITHDRAWN = "RefundWithdrawn"
+    DISPUTED_WITHDRAWN = "DisputedWithdrawn"
+
+
+def _as_enum(enum, value):
+    """The enum member for ``value``; unknown strings are interned so equal states share one object"""
+    if value is None or isinstance(value, enum):
+        return value
+    try:
+        return enum(value)
+    except ValueError:
+        return sys.intern(value)
+
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+@dataclass(slots=True)
+class JobRecord:
+    """
+    Compact in-memory form of a job
+
+    Statuses are enum members (shared singletons), input data is kept as its
+    JSON text and results of at least ``compress_min_bytes`` are stored
+    zlib-compressed. ``to_dict()`` returns the plain job dict the JobStore
+    interface promises.
+    """
+    job_id: str
+    status: JobStatus | str | None
+    created_at: float
+    updated_at: float
+    payment_status: PaymentStatus | str | None = None
+    blockchain_identifier: str | None = None
+    identifier_from_purchaser: str | None = None
+    input_data: str | None = None
+    result: str | bytes | None = None
+    error: str | None = None
+    worker: str | None = None
+
+    def set(self, compress_min_bytes=0, **fields):
+        """Apply job dict fields to the record"""
+        for name, value in fields.items():
+            if name == "status":
+                value = _as_enum(JobStatus, value)
+            elif name == "payment_status":
+                value = _as_enum(PaymentStatus, value)
+            elif name == "input_data" and value is not None:
+                value = json.dumps(value, separators=(",", ":"))
+            elif name == "result" and value is not None:
+                value = str(value)
+                encoded = value.encode("utf-8")
+                if compress_min_bytes and len(encoded) >= compress_min_bytes:
+                    value = zlib.compress(encoded, 6)
+            setattr(self, name, value)
+
+    def to_dict(self):
+        result = self.result
+        if isinstance(result, bytes):
+            result = zlib.decompress(result).decode("utf-8")
+        return {
+            "job_id": self.job_id,
+            "status": _plain(self.status),
+            "payment_status": _plain(self.payment_status),
+            "blockchain_identifier": self.blockchain_identifier,
+            "identifier_from_purchaser": self.identifier_from_purchaser,
+            "input_data": json.loads(self.input_data) if self.input_data is not None else None,
+            "result": result,
+            "error": self.error,
+            "worker": self.worker,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobStore(ABC):
+    """
+    Interface for job persistence.
+
+    Jobs are plain dicts with the keys in ``JOB_FIELDS``. ``result`` is always
+    the raw result string, never a CrewOutput, so finished jobs stay small.
+    """
+
+    @abstractmethod
+    def create(self, job_id, **fields):
+        """Store a new job"""
+
+    @abstractmethod
+    def get(self, job_id):
+        """Return the job dict, or None if it does not exist"""
+
+    @abstractmethod
+    def get_status(self, job_id):
+        """Return (status, payment_status), or None if the job does not exist"""
+
+    @abstractmethod
+    def update(self, job_id, **fields):
+        """Change some fields of a job"""
+
+    @abstractmethod
+    def set_status(self, job_ids, status, **fields):
+        """Move several jobs to ``status`` at once; returns the number updated"""
+
+    @abstractmethod
+    def find(self, status=None, blockchain_identifier=None, identifier_from_purchaser=None, limit=None):
+        """Return jobs matching every given filter"""
+
+    @abstractmethod
+    def find_created_after(self, status, created_after):
+        """Return the ``TRACKING_FIELDS`` of jobs in ``status`` created after ``created_after``, oldest first"""
+
+    @abstractmethod
+    def count_by_status(self):
+        """Return a {status: count} mapping"""
+
+    @abstractmethod
+    def purge_expired(self, ttl_seconds):
+        """Delete finished jobs older than ``ttl_seconds``; returns the number deleted"""
+
+    def close(self):
+        pass
+
+    def __contains__(self, job_id):
+        return self.get_status(job_id) is not None
+
+
+class MemoryJobStore(JobStore):
+    """In-process store for local development (lost on restart), holding one JobRecord per job"""
+
+    def __init__(self, compress_min_bytes=1024):
+        """
+        Args:
+            compress_min_bytes: Results at least this large are kept compressed (0 = never)
+        """
+        self.compress_min_bytes = compress_min_bytes
+        self._jobs = {}
+
+    def create(self, job_id, **fields):
+        now = time.time()
+        job = JobRecord(job_id, None, now, now)
+        job.set(self.compress_min_bytes, **fields)
+        self._jobs[job_id] = job
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def get_status(self, job_id):
+        job = self._jobs.get(job_id)
+        return (_plain(job.status), _plain(job.payment_status)) if job else None
+
+    def update(self, job_id, **fields):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.set(self.compress_min_bytes, updated_at=time.time(), **fields)
+
+    def set_status(self, job_ids, status, **fields):
+        updated = 0
+        for job_id in job_ids:
+            if job_id in self._jobs:
+                self.update(job_id, status=status, **fields)
+                updated += 1
+        return updated
+
+    def find(self, status=None, blockchain_identifier=None, identifier_from_purchaser=None, limit=None):
+        filters = {
+            "status": status,
+            "blockchain_identifier": blockchain_identifier,
+            "identifier_from_purchaser": identifier_from_purchaser,
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        matches = [
+            job.to_dict() for job in self._jobs.values()
+            if all(getattr(job, k) == v for k, v in filters.items())
+        ]
+        return matches[:limit] if limit else matches
+
+    def find_created_after(self, status, created_after):
+        matches = sorted(
+            (job for job in self._jobs.values() if job.status == status and job.created_at > created_after),
+            key=lambda job: job.created_at,
+        )
+        return [{name: _plain(getattr(job, name)) for name in TRACKING_FIELDS} for job in matches]
+
+    def count_by_status(self):
+        counts = {}
+        for job in self._jobs.values():
+            status = _plain(job.status)
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def purge_expired(self, ttl_seconds):
+        cutoff = time.time() - ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in TERMINAL_STATUSES and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Embedded SQLite store in WAL mode.
+
+    Every lookup used by the API is served by the primary key or an index, so
+    memory use does not grow with the number of jobs and state survives
+    restarts.
+    """
+
+    def __init__(self, path="data/jobs.db"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payment_status TEXT,
+                blockchain_identifier TEXT,
+                identifier_from_purchaser TEXT,
+                input_data TEXT,
+                result TEXT,
+                error TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_blockchain_identifier ON jobs(blockchain_identifier);
+            CREATE INDEX IF NOT EXISTS idx_jobs_identifier_from_purchaser ON jobs(identifier_from_purchaser);
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "worker" not in columns:
+            # Databases created before multi-worker mode
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+        logger.info(f"SQLite job store opened at {path}")
+
+    @staticmethod
+    def _encode(fields):
+        if "input_data" in fields and fields["input_data"] is not None:
+            fields["input_data"] = json.dumps(fields["input_data"])
+        return fields
+
+    @staticmethod
+    def _decode(row):
+        job = dict(row)
+        if job.get("input_data") is not None:
+            job["input_data"] = json.loads(job["input_data"])
+        return job
+
+    def create(self, job_id, **fields):
+        now = time.time()
+        fields = self._encode(dict(fields, job_id=job_id, created_at=now, updated_at=now))
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        with self._lock:
+            self._conn.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", tuple(fields.values()))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def get_status(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, payment_status FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return (row["status"], row["payment_status"]) if row else None
+
+    def update(self, job_id, **fields):
+        self._update_many([job_id], fields)
+
+    def set_status(self, job_ids, status, **fields):
+        return self._update_many(job_ids, dict(fields, status=status))
+
+    def _update_many(self, job_ids, fields):
+        fields = self._encode(dict(fields, updated_at=time.time()))
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        params = [tuple(fields.values()) + (job_id,) for job_id in job_ids]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.executemany(f"UPDATE jobs SET {assignments} WHERE job_id = ?", params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def find(self, status=None, blockchain_identifier=None, identifier_from_purchaser=None, limit=None):
+        filters = {
+            "status": status,
+            "blockchain_identifier": blockchain_identifier,
+            "identifier_from_purchaser": identifier_from_purchaser,
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        query = "SELECT * FROM jobs"
+        if filters:
+            query += " WHERE " + " AND ".join(f"{name} = ?" for name in filters)
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(query, tuple(filters.values())).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def find_created_after(self, status, created_after):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(TRACKING_FIELDS)} FROM jobs WHERE status = ? AND created_at > ? ORDER BY created_at",
+                (status, created_after),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_by_status(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def purge_expired(self, ttl_seconds):
+        cutoff = time.time() - ttl_seconds
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?",
+                TERMINAL_STATUSES + (cutoff,),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store():
+    """Build the job store selected by JOB_STORE (sqlite or memory)"""
+    backend = os.getenv("JOB_STORE", "sqlite")
+    if backend == "memory":
+        logger.warning("Using in-memory job store (jobs are lost on restart)")
+        return MemoryJobStore(compress_min_bytes=int(os.getenv("JOB_RESULT_COMPRESS_MIN_BYTES", "1024")))
+    if backend == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH", "data/jobs.db"))
+    raise ValueError(f"Unknown JOB_STORE backend: {backend}")
+
+
+async def run_retention(store, ttl_seconds, interval_seconds=3600):
+    """Periodically purge finished jobs older than ``ttl_seconds``"""
+    while True:
+        try:
+            purged = store.purge_expired(ttl_seconds)
+            if purged:
+                logger.info(f"Purged {purged} expired jobs from the job store")
+        except Exception as e:
+            logger.error(f"Error purging expired jobs: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import math
+import mmap
+import heapq
+import shutil
+import threading
+import time
+from array import array
+from cluster import FileLock
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_VERSION = 1
+DOCUMENT_EXTENSIONS = (".txt", ".md", ".pdf")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in into is it its of on or that the their "
+    "this to was were what when which who will with you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercase alphanumeric terms without common English stopwords"""
+    return [term for term in _TOKEN_PATTERN.findall(text.lower()) if term not in _STOPWORDS]
+
+
+def chunk_text(text, max_words=180, overlap=30):
+    """
+    Split a document into passages of at most ``max_words`` words
+
+    Paragraphs are packed together until the limit; a paragraph longer than
+    the limit is cut into windows that overlap by ``overlap`` words.
+    """
+    chunks = []
+    current = []
+    current_words = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if current and current_words + len(words) > max_words:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_words = 0
+        if len(words) > max_words:
+            step = max(1, max_words - overlap)
+            for start in range(0, len(words), step):
+                chunks.append(" ".join(words[start:start + max_words]))
+                if start + max_words >= len(words):
+                    break
+            continue
+        current.append(" ".join(words))
+        current_words += len(words)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def fingerprint_directory(directory, extensions=DOCUMENT_EXTENSIONS):
+    """Map of relative path -> [size, mtime_ns] for the indexable files in ``directory``"""
+    fingerprint = {}
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.lower().endswith(extensions):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            fingerprint[os.path.relpath(path, directory)] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def _mapped_array(path, typecode):
+    """Read-only memoryview of a binary array file (an empty array for empty files)"""
+    if os.path.getsize(path) == 0:
+        return array(typecode), None
+    with open(path, "rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(typecode), mapped
+
+
+class KnowledgeIndex:
+    """
+    BM25 index over knowledgebase passages, persisted as memory-mapped files.
+
+    On disk an index is a directory holding ``index.json`` (vocabulary and
+    sources) plus flat binary arrays for the postings, passage lengths and
+    passage text. Loading maps the arrays instead of reading them, so startup
+    costs little more than parsing the vocabulary, and worker processes share
+    the pages through the OS cache.
+    """
+
+    def __init__(self, meta, postings, doc_lengths, text_offsets, text, mappings=()):
+        self.meta = meta
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self._terms = meta["terms"]
+        self._sources = meta["sources"]
+        self._chunk_sources = meta["chunk_sources"]
+        self._postings = postings
+        self._doc_lengths = doc_lengths
+        self._text_offsets = text_offsets
+        self._text = text
+        self._mappings = list(mappings)
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    @classmethod
+    def build(cls, passages, k1=1.5, b=0.75, fingerprint=None):
+        """
+        Build an in-memory index
+
+        Args:
+            passages: Iterable of (source, passage text)
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+            fingerprint: Description of the inputs, stored to detect stale indexes
+        """
+        inverted = {}
+        sources = []
+        source_ids = {}
+        chunk_sources = []
+        doc_lengths = array("I")
+        text_offsets = array("Q", [0])
+        text = bytearray()
+        for chunk_id, (source, passage) in enumerate(passages):
+            terms = tokenize(passage)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                inverted.setdefault(term, []).append((chunk_id, count))
+            if source not in source_ids:
+                source_ids[source] = len(sources)
+                sources.append(source)
+            chunk_sources.append(source_ids[source])
+            doc_lengths.append(len(terms))
+            text.extend(passage.encode("utf-8"))
+            text_offsets.append(len(text))
+
+        postings = array("I")
+        terms = {}
+        for term in sorted(inverted):
+            entries = inverted[term]
+            terms[term] = [len(postings), len(entries)]
+            for chunk_id, count in entries:
+                postings.append(chunk_id)
+                postings.append(count)
+
+        meta = {
+            "version": INDEX_VERSION,
+            "k1": k1,
+            "b": b,
+            "avgdl": (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0,
+            "terms": terms,
+            "sources": sources,
+            "chunk_sources": chunk_sources,
+            "fingerprint": fingerprint or {},
+        }
+        return cls(meta, postings, doc_lengths, text_offsets, bytes(text))
+
+    def save(self, path):
+        """Write the index to directory ``path``, replacing any previous index atomically"""
+        staging = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, values in (
+            ("postings.bin", self._postings),
+            ("doc_lengths.bin", self._doc_lengths),
+            ("text_offsets.bin", self._text_offsets),
+        ):
+            with open(os.path.join(staging, name), "wb") as handle:
+                handle.write(values if isinstance(values, array) else bytes(values))
+        with open(os.path.join(staging, "text.bin"), "wb") as handle:
+            handle.write(self._text)
+        with open(os.path.join(staging, "index.json"), "w", encoding="utf-8") as handle:
+            json.dump(self.meta, handle, ensure_ascii=False, separators=(",", ":"))
+
+        previous = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.replace(path, previous)
+        os.replace(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path):
+        """Open a saved index with its arrays memory-mapped"""
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported knowledge index version: {meta.get('version')}")
+        mappings = []
+        arrays = []
+        for name, typecode in (("postings.bin", "I"), ("doc_lengths.bin", "I"), ("text_offsets.bin", "Q")):
+            values, mapped = _mapped_array(os.path.join(path, name), typecode)
+            arrays.append(values)
+            if mapped is not None:
+                mappings.append(mapped)
+        text_path = os.path.join(path, "text.bin")
+        text = b""
+        if os.path.getsize(text_path):
+            with open(text_path, "rb") as handle:
+                text = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            mappings.append(text)
+        return cls(meta, *arrays, text, mappings)
+
+    def passage(self, chunk_id):
+        start, end = self._text_offsets[chunk_id], self._text_offsets[chunk_id + 1]
+        return self._text[start:end].decode("utf-8")
+
+    def search(self, query, k=4):
+        """
+        Return the ``k`` best passages for ``query`` by BM25 score
+
+        Returns:
+            A list of {"source", "text", "score"} dicts, best first
+        """
+        count = len(self._doc_lengths)
+        if not count:
+            return []
+        scores = {}
+        for term in set(tokenize(query)):
+            entry = self._terms.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for position in range(start, start + 2 * df, 2):
+                chunk_id = self._postings[position]
+                tf = self._postings[position + 1]
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[chunk_id] / self.avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "source": self._sources[self._chunk_sources[chunk_id]],
+                "text": self.passage(chunk_id),
+                "score": round(score, 4),
+            }
+            for chunk_id, score in best
+        ]
+
+    def close(self):
+        # Views into the maps must be released before the maps can close
+        self._postings = self._doc_lengths = self._text_offsets = array("I")
+        self._text = b""
+        for mapped in self._mappings:
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        self._mappings = []
+
+
+def index_build_lock(index_path):
+    """
+    Lock serialising index builds across processes (API_WORKERS > 1)
+
+    Use as ``with index_build_lock(path):`` around anything that writes the
+    index or its chunk cache.
+    """
+    return FileLock(f"{os.path.normpath(index_path)}.lock")
+
+
+def build_knowledge_index(directory, index_path):
+    """
+    Ingest the documents under ``directory`` (see knowledge_ingest.py), build the index and save it
+
+    The caller must hold index_build_lock(index_path).
+
+    Returns:
+        The saved index, loaded back memory-mapped
+    """
+    from knowledge_ingest import ingest_directory
+    ingest_directory(directory, index_path)
+    return KnowledgeIndex.load(index_path)
+
+
+def _load_current_index(directory, index_path):
+    """The saved index if it matches the knowledgebase, else None"""
+    if not os.path.exists(os.path.join(index_path, "index.json")):
+        return None
+    try:
+        index = KnowledgeIndex.load(index_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load knowledge index, rebuilding: {str(e)}")
+        return None
+    if index.meta.get("fingerprint") == fingerprint_directory(directory):
+        return index
+    index.close()
+    logger.info("Knowledgebase changed, rebuilding the knowledge index")
+    return None
+
+
+def load_or_build_index(directory, index_path):
+    """
+    Open the saved index, rebuilding it first when the knowledgebase changed
+
+    Only one process rebuilds at a time; the others wait for it and then
+    open the index it built.
+
+    Returns:
+        A KnowledgeIndex, or None when ``directory`` does not exist
+    """
+    if not os.path.isdir(directory):
+        return None
+    index = _load_current_index(directory, index_path)
+    if index is not None:
+        return index
+    with index_build_lock(index_path):
+        # Another process may have rebuilt the index while this one waited
+        index = _load_current_index(directory, index_path)
+        if index is not None:
+            return index
+        return build_knowledge_index(directory, index_path)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index():
+    """
+    Process-wide knowledge index, opened on first use
+
+    Reads KNOWLEDGE_ENABLED, KNOWLEDGEBASE_DIR and KNOWLEDGE_INDEX_PATH.
+
+    Returns:
+        The index, or None when retrieval is disabled or there is no knowledgebase
+    """
+    global _index
+    if os.getenv("KNOWLEDGE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _index_lock:
+        if _index is None:
+            start = time.perf_counter()
+            directory = os.getenv("KNOWLEDGEBASE_DIR", "knowledgebase")
+            index_path = os.getenv("KNOWLEDGE_INDEX_PATH", "data/knowledge_index")
+            try:
+                _index = load_or_build_index(directory, index_path)
+            except Exception as e:
+                logger.error(f"Knowledge index unavailable: {str(e)}", exc_info=True)
+                _index = None
+                return None
+            if _index is None:
+                logger.info(f"No knowledgebase at {directory}, retrieval disabled")
+                # Cache the miss as an empty index so later calls stay cheap
+                _index = KnowledgeIndex.build([])
+            else:
+                logger.info(
+                    f"Knowledge index ready: {len(_index)} passages in "
+                    f"{round((time.perf_counter() - start) * 1000, 2)} ms"
+                )
+        return _index if len(_index) else None
@@ -0,0 +1,250 @@
+"""
+Incremental ingestion of knowledgebase documents into the knowledge index
+
+Every document is streamed page by page, normalised, chunked and written to
+a per-document chunk file named after the document's content hash. Only new
+or changed documents are parsed (in a process pool); the index is then
+rebuilt from the cached chunks, which takes well under a second. A document
+that fails to parse is recorded as failed in the manifest and only tried
+again once its content changes.
+
+    python knowledge_ingest.py [--workers 4]
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from knowledge_index import KnowledgeIndex, chunk_text, fingerprint_directory, index_build_lock
+from logging_config import get_logger, setup_worker_logging
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Content hash of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalise_text(text):
+    """Undo PDF line-break hyphenation, unify Unicode forms, drop zero-width characters and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", re.sub(r"[\x00\u200b-\u200d\ufeff]", "", text))
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = re.sub(r"[ \t\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def iter_pdf_pages(path):
+    """
+    Yield (page number, text) for each page of a PDF
+
+    Pages are parsed one at a time, so memory stays bounded by the largest
+    page rather than the whole document.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("pypdf is required to ingest PDF files (pip install pypdf)")
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, start=1):
+        yield number, page.extract_text() or ""
+
+
+def iter_text_pages(path, block_chars=1 << 16):
+    """Yield (block number, text) for a text file, in blocks ending at a paragraph break"""
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        pending = ""
+        number = 0
+        for block in iter(lambda: handle.read(block_chars), ""):
+            pending += block
+            cut = pending.rfind("\n\n")
+            if cut <= 0:
+                continue
+            number += 1
+            yield number, pending[:cut]
+            pending = pending[cut:]
+        if pending.strip():
+            yield number + 1, pending
+
+
+def iter_pages(path):
+    if path.lower().endswith(".pdf"):
+        return iter_pdf_pages(path)
+    return iter_text_pages(path)
+
+
+def ingest_file(path, source, chunk_path, max_words=180, overlap=30):
+    """
+    Stream one document into a JSON-lines chunk file
+
+    Runs in a worker process. Chunks are written as they are produced and
+    the file is only moved into place once the document is complete.
+
+    Returns:
+        (source, number of chunks, seconds taken)
+    """
+    start = time.perf_counter()
+    is_pdf = path.lower().endswith(".pdf")
+    staging = f"{chunk_path}.tmp-{os.getpid()}"
+    count = 0
+    with open(staging, "w", encoding="utf-8") as out:
+        for number, text in iter_pages(path):
+            page = number if is_pdf else None
+            for passage in chunk_text(normalise_text(text), max_words=max_words, overlap=overlap):
+                out.write(json.dumps([page, passage], ensure_ascii=False) + "\n")
+                count += 1
+    os.replace(staging, chunk_path)
+    return source, count, time.perf_counter() - start
+
+
+def iter_cached_passages(cache_dir, manifest):
+    """Yield (source, passage) from the chunk files of every parsed document in the manifest"""
+    for source in sorted(manifest):
+        if manifest[source].get("failed"):
+            continue
+        with open(os.path.join(cache_dir, f"{manifest[source]['sha256']}.jsonl"), encoding="utf-8") as chunks:
+            for line in chunks:
+                page, passage = json.loads(line)
+                yield (f"{source} (page {page})" if page is not None else source), passage
+
+
+def _load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(cache_dir, manifest):
+    staging = os.path.join(cache_dir, f"{MANIFEST_NAME}.tmp-{os.getpid()}")
+    with open(staging, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(staging, os.path.join(cache_dir, MANIFEST_NAME))
+
+
+def ingest_directory(directory, index_path, cache_dir=None, workers=None):
+    """
+    Bring the knowledge index up to date with the documents in ``directory``
+
+    The caller must hold index_build_lock(index_path), so two processes never
+    write the same index or chunk cache at once.
+
+    Args:
+        directory: Knowledgebase root (.txt, .md and .pdf files)
+        index_path: Where the KnowledgeIndex is saved
+        cache_dir: Chunk cache (default: KNOWLEDGE_CACHE_DIR, data/knowledge_cache)
+        workers: Parser processes (default: KNOWLEDGE_INGEST_WORKERS, up to 4)
+
+    Returns:
+        A dict with the number of documents parsed, reused and indexed passages,
+        and the documents that failed to parse, now or in an earlier run
+    """
+    start = time.perf_counter()
+    cache_dir = cache_dir or os.getenv("KNOWLEDGE_CACHE_DIR", "data/knowledge_cache")
+    workers = workers or int(os.getenv("KNOWLEDGE_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fingerprint = fingerprint_directory(directory)
+    previous = _load_manifest(cache_dir)
+    manifest = {}
+    pending = []
+    for source, (size, mtime_ns) in fingerprint.items():
+        entry = previous.get(source)
+        if entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            sha256 = entry["sha256"]
+        else:
+            sha256 = file_sha256(os.path.join(directory, source))
+        if previous.get(source, {}).get("failed") and previous[source]["sha256"] == sha256:
+            # Parsing this content failed before; wait for the file to change
+            manifest[source] = {**previous[source], "size": size, "mtime_ns": mtime_ns}
+            continue
+        entry = {"size": size, "mtime_ns": mtime_ns, "sha256": sha256}
+        if os.path.exists(os.path.join(cache_dir, f"{sha256}.jsonl")):
+            manifest[source] = entry
+        else:
+            pending.append((source, entry))
+
+    failed = []
+    errors = {}
+    if pending:
+        jobs = [
+            (os.path.join(directory, source), source, os.path.join(cache_dir, f"{entry['sha256']}.jsonl"))
+            for source, entry in pending
+        ]
+        entries = dict(pending)
+        results = []
+        if len(jobs) == 1 or workers <= 1:
+            for job in jobs:
+                try:
+                    results.append(ingest_file(*job))
+                except Exception as e:
+                    failed.append(job[1])
+                    errors[job[1]] = str(e)
+                    logger.warning(f"Could not ingest {job[1]}: {str(e)}")
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=setup_worker_logging) as pool:
+                futures = {pool.submit(ingest_file, *job): job[1] for job in jobs}
+                for future, source in futures.items():
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        failed.append(source)
+                        errors[source] = str(e)
+                        logger.warning(f"Could not ingest {source}: {str(e)}")
+        for source, count, seconds in results:
+            manifest[source] = entries[source]
+            logger.info(f"Ingested {source}: {count} chunks in {round(seconds, 2)}s")
+        for source in failed:
+            manifest[source] = {**entries[source], "failed": True, "error": errors[source]}
+
+    # Drop chunk files no document refers to any more
+    live = {f"{entry['sha256']}.jsonl" for entry in manifest.values() if not entry.get("failed")}
+    for name in os.listdir(cache_dir):
+        if name.endswith(".jsonl") and name not in live:
+            os.remove(os.path.join(cache_dir, name))
+    _save_manifest(cache_dir, manifest)
+
+    # Failed documents are fingerprinted too: the index stays current until
+    # one of them changes, and only then is it parsed again
+    index = KnowledgeIndex.build(iter_cached_passages(cache_dir, manifest), fingerprint=fingerprint)
+    index.save(index_path)
+    still_failing = sorted(source for source, entry in manifest.items() if entry.get("failed"))
+    stats = {
+        "documents": len(fingerprint),
+        "parsed": len(pending) - len(failed),
+        "reused": len(fingerprint) - len(pending) - (len(still_failing) - len(failed)),
+        "failed": still_failing,
+        "passages": len(index),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"Knowledge index rebuilt: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Ingest the knowledgebase into the knowledge index")
+    parser.add_argument("--directory", default=os.getenv("KNOWLEDGEBASE_DIR", "knowledgebase"))
+    parser.add_argument("--index-path", default=os.getenv("KNOWLEDGE_INDEX_PATH", "data/knowledge_index"))
+    parser.add_argument("--workers", type=int, help="Parser processes")
+    args = parser.parse_args()
+    if not os.path.isdir(args.directory):
+        sys.exit(f"No knowledgebase directory at {args.directory}")
+    with index_build_lock(args.index_path):
+        stats = ingest_directory(args.directory, args.index_path, workers=args.workers)
+    print(json.dumps(stats, indent=2))
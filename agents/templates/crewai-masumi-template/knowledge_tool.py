@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from crewai.tools import BaseTool
+
+
+class KnowledgeSearchInput(BaseModel):
+    query: str = Field(..., description="Keywords or a question to look up in the knowledgebase")
+
+
+class KnowledgeSearchTool(BaseTool):
+    """
+    crewai tool returning the top-k knowledgebase passages for a query
+
+    Only the matching passages reach the prompt, not the whole knowledgebase.
+    """
+
+    name: str = "search_knowledgebase"
+    description: str = (
+        "Search the local knowledgebase (project docs and notes) and return the most relevant passages "
+        "with their source file. Use it before answering questions about the topics it covers."
+    )
+    args_schema: type[BaseModel] = KnowledgeSearchInput
+    index: object = None
+    top_k: int = 4
+    max_chars: int = 1200
+
+    def _run(self, query: str) -> str:
+        hits = self.index.search(query, k=self.top_k) if self.index is not None else []
+        if not hits:
+            return "No relevant passages found in the knowledgebase."
+        return "\n\n".join(
+            f"[{rank}] {hit['source']}\n{hit['text'][:self.max_chars]}"
+            for rank, hit in enumerate(hits, start=1)
+        )
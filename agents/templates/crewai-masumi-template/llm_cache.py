@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from crewai import BaseLLM
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMResponseCache:
+    """
+    SQLite store of LLM responses keyed by the canonicalised request.
+
+    Entries are evicted least recently used first once ``max_entries`` is
+    exceeded. One store is shared by every crew in the process.
+    """
+
+    def __init__(self, path="data/llm_cache.db", max_entries=5000):
+        """
+        Args:
+            path: SQLite file
+            max_entries: Responses kept on disk
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+        """)
+
+    @staticmethod
+    def make_key(request):
+        """SHA-256 of the request as canonical JSON (sorted keys, no insignificant whitespace)"""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._counters["hits"] += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._counters["stores"] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachingLLM(BaseLLM):
+    """
+    LLM wrapper that answers repeated identical requests from an LLMResponseCache
+
+    The key covers the model, temperature, base URL, stop words, messages and
+    tool schemas. Calls with a temperature above 0 sample a fresh answer each
+    time, so they bypass the cache unless ``cache_sampled`` is set. Only plain
+    text responses are stored.
+
+    Args:
+        llm: The wrapped crewai LLM
+        cache: Shared LLMResponseCache
+        cache_sampled: Also cache calls with temperature > 0
+    """
+
+    def __init__(self, llm, cache, cache_sampled=False):
+        super().__init__(model=llm.model, temperature=getattr(llm, "temperature", None))
+        self.stop = list(getattr(llm, "stop", None) or [])
+        self.llm = llm
+        self.cache = cache
+        self.cache_sampled = cache_sampled
+
+    def _request(self, messages, tools):
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "base_url": getattr(self.llm, "base_url", None),
+            "stop": sorted(self.stop or []),
+            "messages": messages,
+            "tools": tools,
+        }
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        # Agents add their stop words to the LLM they were given; pass them on
+        self.llm.stop = self.stop
+        if (self.temperature or 0) > 0 and not self.cache_sampled:
+            self.cache.record_bypass()
+            return self.llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+
+        key = self.cache.make_key(self._request(messages, tools))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = self.llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+        if isinstance(response, str):
+            self.cache.put(key, response)
+        return response
+
+    def supports_function_calling(self):
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self):
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.llm.get_context_window_size()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Process-wide response cache, or None when LLM_CACHE_ENABLED is not set
+
+    Reads LLM_CACHE_ENABLED, LLM_CACHE_PATH and LLM_CACHE_SIZE.
+    """
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", "data/llm_cache.db"),
+                max_entries=int(os.getenv("LLM_CACHE_SIZE", "5000")),
+            )
+            logger.info(f"LLM response cache enabled at {os.getenv('LLM_CACHE_PATH', 'data/llm_cache.db')}")
+        return _cache
+
+
+def with_response_cache(llm):
+    """
+    Wrap ``llm`` in a CachingLLM when the response cache is enabled
+
+    LLM_CACHE_SAMPLED=true also caches calls with temperature > 0.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return llm
+    return CachingLLM(llm, cache, cache_sampled=os.getenv("LLM_CACHE_SAMPLED", "false").lower() in ("1", "true", "yes"))
@@ -1,55 +1,476 @@
 import os
+import copy
+import json
+import time
+import queue
+import atexit
+import random
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, WatchedFileHandler, QueueHandler, QueueListener
 
-def setup_logging(log_level=logging.INFO):
+# Active queue handler/listener when asynchronous logging is enabled
+_queue_handler = None
+_queue_listener = None
+
+# Held by the one process on the host that rotates logs/app.log
+_rotation_lock = None
+
+# Per-task/per-request fields (job_id, phase, ...) attached to every record
+_log_context = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def truncate(value, limit=None):
     """
-    Configure application-wide logging
-    
+    Shorten large payloads before they are logged
+
     Args:
-        log_level: The minimum log level to capture (default: INFO)
-    
+        value: Any value; non-strings are converted with str()
+        limit: Maximum characters (default: LOG_MAX_FIELD_CHARS, 2000)
+
     Returns:
-        logger: Configured logger instance
+        The string, cut to ``limit`` characters with the original length noted
+    """
+    limit = limit or int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} of {len(text)} chars]"
+
+
+@contextmanager
+def log_context(**fields):
     """
+    Attach fields such as job_id to every log record in this context
+
+    Contextvars follow asyncio tasks, so the fields apply to everything the
+    current request or job logs until the block exits.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields):
+    """
+    Attach fields to every later log record in the current asyncio task
+
+    Unlike log_context() this is not undone automatically; use it at the top
+    of a request handler or background job, which runs in its own task.
+    """
+    _log_context.set({**_log_context.get(), **fields})
+
+
+@contextmanager
+def log_phase(logger, phase, **fields):
+    """
+    Run a block as a named job phase and log its duration when it ends
+
+    Args:
+        logger: Logger that receives the "phase finished" record
+        phase: Phase name, e.g. "crew" or "complete_payment"
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    with log_context(phase=phase, **fields):
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            logger.info(
+                f"Phase {phase} finished in {duration_ms} ms",
+                extra={"duration_ms": duration_ms, "outcome": outcome}
+            )
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context onto each record in the calling thread"""
+
+    def filter(self, record):
+        context = _log_context.get()
+        if context:
+            record.context = context
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of high-frequency records
+
+    Only records logged with ``extra={"sampled": True}`` are subject to
+    sampling; everything else always passes.
+
+    Args:
+        rates: Mapping of level name to the fraction of records kept
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {logging.getLevelName(name.upper()): rate for name, rate in rates.items()}
+        self.sampled_out = 0
+
+    @staticmethod
+    def parse_rates(spec):
+        """Parse "DEBUG=0.01,INFO=0.1" into {"DEBUG": 0.01, "INFO": 0.1}"""
+        rates = {}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            name, _, rate = part.partition("=")
+            rates[name.strip()] = float(rate)
+        return rates
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False):
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line
+
+    Each line carries timestamp, level, logger and message, the fields from
+    log_context() and any extra= fields. Long strings are truncated.
+    """
+
+    def __init__(self, max_field_chars=2000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_field_chars),
+        }
+        entry.update(getattr(record, "context", {}))
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRIBUTES or key in ("context", "sampled"):
+                continue
+            entry[key] = value if isinstance(value, (int, float, bool)) or value is None else truncate(value, self.max_field_chars)
+        if record.exc_info:
+            entry["exception"] = truncate(self.formatException(record.exc_info), self.max_field_chars * 4)
+        elif record.exc_text:
+            entry["exception"] = truncate(record.exc_text, self.max_field_chars * 4)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BatchFlushRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that does not flush after every record
+
+    The queue listener writes a batch of records and then calls flush_batch()
+    once, so disk flushes happen per batch instead of per log call.
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        RotatingFileHandler.flush(self)
+
+
+class BatchFlushWatchedFileHandler(WatchedFileHandler):
+    """WatchedFileHandler that flushes once per batch, like BatchFlushRotatingFileHandler"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        WatchedFileHandler.flush(self)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler over a bounded queue that never blocks the caller
+
+    Args:
+        log_queue: Bounded queue.Queue shared with the listener
+        drop_policy: "drop_new" discards the incoming record when the queue is
+            full, "drop_oldest" discards the oldest queued record instead
+    """
+
+    def __init__(self, log_queue, drop_policy="drop_new"):
+        super().__init__(log_queue)
+        self.drop_policy = drop_policy
+        self._lock_counters = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep message and traceback separate so the listener's formatter
+        # (text or JSON) lays them out itself
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.drop_policy == "drop_oldest":
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+            with self._lock_counters:
+                self.dropped += 1
+            return
+        with self._lock_counters:
+            self.enqueued += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    QueueListener that drains records in batches and flushes once per batch
+
+    Args:
+        log_queue: Queue fed by DroppingQueueHandler
+        handlers: Handlers that receive every record
+        batch_size: Maximum records written between flushes
+        flush_interval: Seconds between checks of an idle queue
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=256, flush_interval=0.5):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+
+    def enqueue_sentinel(self):
+        # Block rather than fail if the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+    def _flush_handlers(self):
+        for handler in self.handlers:
+            flush = getattr(handler, "flush_batch", handler.flush)
+            flush()
+
+    def _monitor(self):
+        q = self.queue
+        has_task_done = hasattr(q, "task_done")
+        while True:
+            try:
+                record = q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            stop = record is self._sentinel
+            written = 0
+            while not stop:
+                self.handle(record)
+                written += 1
+                if has_task_done:
+                    q.task_done()
+                if written >= self.batch_size:
+                    break
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                stop = record is self._sentinel
+            self._flush_handlers()
+            self.batches += 1
+            if stop:
+                if has_task_done:
+                    q.task_done()
+                break
+
+
+def _log_file():
     # Create logs directory if it doesn't exist
     log_directory = "logs"
     os.makedirs(log_directory, exist_ok=True)
-    log_file = os.path.join(log_directory, "app.log")
-    
-    # Create formatter for consistent log formatting
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Set up rotating file handler (10 MB per file, keep 5 backup files)
-    file_handler = RotatingFileHandler(
-        log_file, 
-        maxBytes=10*1024*1024,  # 10 MB
-        backupCount=5
-    )
+    return os.path.join(log_directory, "app.log")
+
+
+def _file_formatter(log_format=None):
+    """Formatter for LOG_FORMAT (text or json)"""
+    if log_format is None:
+        log_format = os.getenv("LOG_FORMAT", "text")
+    if log_format == "json":
+        return JsonFormatter(max_field_chars=int(os.getenv("LOG_MAX_FIELD_CHARS", "2000")))
+    return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def _sampling_filter():
+    return SamplingFilter(SamplingFilter.parse_rates(os.getenv("LOG_SAMPLE_RATES", "DEBUG=0.1,INFO=0.1")))
+
+
+def _is_log_rotator(log_file):
+    """
+    Whether this process rotates the log file
+
+    Several processes may write logs/app.log (API_WORKERS > 1); if each
+    rotated it, one would rename the file while the others kept writing to
+    the renamed copy. The first process to take the lock file rotates until
+    it exits; the others reopen the file after it has been rotated.
+    """
+    global _rotation_lock
+    # cluster logs through this module, so import it only when needed
+    from cluster import FileLock
+    if _rotation_lock is None:
+        _rotation_lock = FileLock(f"{log_file}.lock")
+    return _rotation_lock.try_acquire()
+
+
+def setup_logging(log_level=logging.INFO, async_mode=None, log_format=None):
+    """
+    Configure application-wide logging
+
+    Args:
+        log_level: The minimum log level to capture (default: INFO)
+        async_mode: Write logs from a background thread through a bounded queue
+            (default: LOG_ASYNC environment variable, enabled unless "false")
+        log_format: "text" or "json" (default: LOG_FORMAT environment variable, text)
+
+    Returns:
+        logger: Configured logger instance
+    """
+    global _queue_handler, _queue_listener
+
+    log_file = _log_file()
+
+    if async_mode is None:
+        async_mode = os.getenv("LOG_ASYNC", "true").lower() not in ("0", "false", "no")
+
+    file_formatter = _file_formatter(log_format)
+
+    if _is_log_rotator(log_file):
+        # Set up rotating file handler (10 MB per file, keep 5 backup files)
+        handler_class = BatchFlushRotatingFileHandler if async_mode else RotatingFileHandler
+        file_handler = handler_class(
+            log_file,
+            maxBytes=10*1024*1024,  # 10 MB
+            backupCount=5
+        )
+    else:
+        handler_class = BatchFlushWatchedFileHandler if async_mode else WatchedFileHandler
+        file_handler = handler_class(log_file)
     file_handler.setFormatter(file_formatter)
-    
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    
+
     # Remove any existing handlers to prevent duplicates
     for handler in root_logger.handlers[:]:
-        if isinstance(handler, logging.StreamHandler):
+        if isinstance(handler, (logging.StreamHandler, QueueHandler)):
             root_logger.removeHandler(handler)
-    
-    # Add the file handler
-    root_logger.addHandler(file_handler)
-    
+    shutdown_logging()
+
+    # Context and sampling run in the calling thread, before any queueing
+    context_filter = ContextFilter()
+    sampling_filter = _sampling_filter()
+
+    if async_mode:
+        # Request-path log calls only enqueue; a listener thread does the disk I/O
+        log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        _queue_handler = DroppingQueueHandler(log_queue, drop_policy=os.getenv("LOG_DROP_POLICY", "drop_new"))
+        _queue_listener = BatchingQueueListener(
+            log_queue,
+            file_handler,
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+            flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+        )
+        _queue_listener.start()
+        atexit.register(shutdown_logging)
+        _queue_handler.addFilter(sampling_filter)
+        _queue_handler.addFilter(context_filter)
+        root_logger.addHandler(_queue_handler)
+    else:
+        # Add the file handler
+        file_handler.addFilter(sampling_filter)
+        file_handler.addFilter(context_filter)
+        root_logger.addHandler(file_handler)
+
     return root_logger
 
+def setup_worker_logging(log_level=logging.INFO):
+    """
+    Configure logging in a pool worker process (ProcessPoolExecutor initializer)
+
+    A forked worker inherits the parent's queue handler but not the listener
+    thread that drains it, so its records would silently pile up. Workers
+    write to the log file directly instead. They never rotate it themselves:
+    WatchedFileHandler reopens the file after the rotating process has
+    rotated it.
+    """
+    global _queue_handler, _queue_listener
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, (logging.StreamHandler, QueueHandler)):
+            root_logger.removeHandler(handler)
+    # The parent owns the listener; stopping it here would wait on a thread
+    # that does not exist in this process
+    _queue_handler = _queue_listener = None
+
+    file_handler = WatchedFileHandler(_log_file())
+    file_handler.setFormatter(_file_formatter())
+    file_handler.addFilter(_sampling_filter())
+    file_handler.addFilter(ContextFilter())
+    root_logger.addHandler(file_handler)
+
+
+def shutdown_logging():
+    """
+    Drain queued records and stop the background logging thread
+    """
+    global _queue_handler, _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = _queue_listener = None
+
+def get_logging_stats():
+    """
+    Report counters for the asynchronous logging pipeline
+
+    Returns:
+        A dict with queue depth and enqueued/dropped/batch counts, or
+        {"async": False} when logging synchronously
+    """
+    if _queue_handler is None:
+        return {"async": False}
+    return {
+        "async": True,
+        "queue_depth": _queue_handler.queue.qsize(),
+        "queue_capacity": _queue_handler.queue.maxsize,
+        "enqueued": _queue_handler.enqueued,
+        "dropped": _queue_handler.dropped,
+        "batches": _queue_listener.batches if _queue_listener is not None else 0
+    }
+
 def get_logger(name):
     """
     Get a logger for a specific module
-    
+
     Args:
         name: Usually __name__ from the calling module
-        
+
     Returns:
         A logger instance with the specified name
     """
-    return logging.getLogger(name) 
\ No newline at end of file
+    return logging.getLogger(name)
@@ -1,20 +1,40 @@
 import os
+import sys
+import json
+import time
+import asyncio
 import uvicorn
 import uuid
+import signal
+import importlib
+import socket
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field, field_validator
-from masumi.config import Config
-from masumi.payment import Payment, Amount
-from crew_definition import ResearchCrew
-from logging_config import setup_logging
+from masumi.payment import Amount
+from payment_client import PooledConfig, PooledPayment as Payment
+from executor import CrewExecutor, CrewCancelledError
+from payment_poller import PaymentPoller
+from job_store import create_job_store, run_retention, MemoryJobStore
+from cluster import LeaderElection
+from work_queue import WorkQueue
+from result_cache import ResultCache
+from singleflight import SingleFlight
+from job_events import JobEventBus, TERMINAL_EVENTS
+from payment_status_cache import PaymentStatusCache
+from metrics import MetricsRegistry
+from knowledge_index import get_knowledge_index
+from prompt_prefix import prefix_stats
+from logging_config import setup_logging, shutdown_logging, get_logging_stats, bind_log_context, log_phase, truncate
+
+# Load environment variables (before logging, which reads the LOG_* settings)
+load_dotenv(override=True)
 
 # Configure logging
 logger = setup_logging()
 
-# Load environment variables
-load_dotenv(override=True)
-
 # Retrieve API Keys and URLs
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PAYMENT_SERVICE_URL = os.getenv("PAYMENT_SERVICE_URL")
@@ -24,23 +44,176 @@ NETWORK = os.getenv("NETWORK")
 logger.info("Starting application with configuration:")
 logger.info(f"PAYMENT_SERVICE_URL: {PAYMENT_SERVICE_URL}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ Starts the warm-up and background work with the server and stops them on shutdown """
+    await start_warm_up()
+    await start_payment_poller()
+    yield
+    await stop_payment_poller()
+
 # Initialize FastAPI
 app = FastAPI(
     title="API following the Masumi API Standard",
     description="API for running Agentic Services tasks with Masumi payment integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Temporary in-memory job store (DO NOT USE IN PRODUCTION)
+# Job Store (SQLite by default, see job_store.py)
 # ─────────────────────────────────────────────────────────────────────────────
-jobs = {}
+job_store = create_job_store()
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", str(7 * 24 * 3600)))
 payment_instances = {}
+# Pushes lifecycle events to /status/stream and /status/ws subscribers
+job_events = JobEventBus()
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# Shared, short-lived payment status for /status
+payment_status_cache = PaymentStatusCache.from_env()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Multi-Worker Mode (API_WORKERS > 1, see cluster.py)
+# ─────────────────────────────────────────────────────────────────────────────
+# Every worker serves the API from the shared job store and runs paid jobs;
+# one elected worker runs the payment poller
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+CLUSTER_MODE = API_WORKERS > 1
+CLUSTER_DIR = os.getenv("CLUSTER_DIR", "data/cluster")
+CLUSTER_POLL_INTERVAL = float(os.getenv("CLUSTER_POLL_INTERVAL", "0.5"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Work Queue (durable hand-off from payment confirmation to crew execution)
+# ─────────────────────────────────────────────────────────────────────────────
+work_queue = WorkQueue.from_env()
+# "api": the API processes run crews; "external": only `python main.py worker` processes do
+CREW_WORKERS = os.getenv("CREW_WORKERS", "api")
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+WORK_QUEUE_POLL_INTERVAL = float(os.getenv("WORK_QUEUE_POLL_INTERVAL", "0.5"))
+if (CLUSTER_MODE or CREW_WORKERS == "external") and isinstance(job_store, MemoryJobStore):
+    raise RuntimeError("Several processes need a job store they can share (JOB_STORE=sqlite)")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Crew Executor (runs blocking crew kickoffs in a bounded worker pool)
+# ─────────────────────────────────────────────────────────────────────────────
+crew_executor = CrewExecutor.from_env()
+logger.info(f"Crew executor: {crew_executor.mode} pool with {crew_executor.max_workers} workers")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Result Cache (skips the crew when the same input was answered recently)
+# ─────────────────────────────────────────────────────────────────────────────
+result_cache = ResultCache.from_env()
+RESULT_CACHE_SCOPE = os.getenv("RESULT_CACHE_SCOPE", "hash")
+# Identical inputs that are already running share one crew run
+crew_flights = SingleFlight()
+# Per-task model choice by latency, errors and deadline (None unless LLM_ROUTE_* is set,
+# assigned once the crew stack is loaded)
+model_router = None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Crew Stack Warm-Up (crewai is imported in the background, after the server is up)
+# ─────────────────────────────────────────────────────────────────────────────
+# Set once crews can run; /start_job, /start_jobs and the work queue consumer wait for it
+crew_ready = asyncio.Event()
+CREW_PREWARM = int(os.getenv("CREW_PREWARM", "1"))
+# A failed warm-up is retried with a doubling delay; after the last attempt the process exits
+WARM_UP_MAX_ATTEMPTS = int(os.getenv("WARM_UP_MAX_ATTEMPTS", "5"))
+WARM_UP_RETRY_DELAY = float(os.getenv("WARM_UP_RETRY_DELAY", "2"))
+warm_up_stats = {"state": "pending", "steps": {}, "attempts": 0}
+
+def prewarm_crew_stack() -> None:
+    """
+    Imports the crew stack, opens the knowledge index and pre-builds pooled
+    crews, recording how long each step took
+    """
+    global model_router
+
+    def step(name, fn):
+        started = time.perf_counter()
+        value = fn()
+        warm_up_stats["steps"][name] = round(time.perf_counter() - started, 3)
+        return value
+
+    crew_definition = step("import_crew_stack", lambda: importlib.import_module("crew_definition"))
+    from model_router import get_model_router
+    model_router = get_model_router()
+    # Open the memory-mapped index (rebuilding it if the knowledgebase changed)
+    step("knowledge_index", get_knowledge_index)
+    if CREW_PREWARM and crew_executor.mode == "thread":
+        try:
+            step("crew_pool", lambda: crew_definition.crew_pool.warm(resolve_llm_settings(), CREW_PREWARM))
+        except Exception as e:
+            # Not fatal: the first job builds its crew and reports the real error
+            logger.warning(f"Could not pre-build crews: {str(e)}")
+
+async def warm_up() -> None:
+    """
+    Runs prewarm_crew_stack off the event loop and marks the process ready
+
+    A failed attempt is retried up to WARM_UP_MAX_ATTEMPTS times. If the crew
+    stack still cannot load, the process exits non-zero so a supervisor
+    restarts it, rather than answering 503 for ever.
+    """
+    started = time.perf_counter()
+    delay = WARM_UP_RETRY_DELAY
+    while True:
+        warm_up_stats.update(state="warming", steps={}, attempts=warm_up_stats["attempts"] + 1)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, prewarm_crew_stack)
+            break
+        except Exception as e:
+            warm_up_stats["error"] = str(e)
+            if warm_up_stats["attempts"] >= WARM_UP_MAX_ATTEMPTS:
+                warm_up_stats["state"] = "failed"
+                logger.critical(
+                    f"Could not load the crew stack after {warm_up_stats['attempts']} attempts, exiting: {str(e)}",
+                    exc_info=True
+                )
+                shutdown_logging()
+                os._exit(1)
+            warm_up_stats["state"] = "retrying"
+            logger.error(f"Could not load the crew stack, retrying in {delay}s: {str(e)}", exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+    warm_up_stats.pop("error", None)
+    warm_up_stats.update(state="ready", seconds=round(time.perf_counter() - started, 3))
+    crew_ready.set()
+    logger.info(f"Crew stack ready in {warm_up_stats['seconds']}s: {warm_up_stats['steps']}")
+
+async def start_warm_up():
+    # Not awaited: the API answers health checks while crewai loads
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+
+def require_crew_ready() -> None:
+    """ Rejects new jobs with 503 until the crew stack has loaded """
+    if not crew_ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="The agent is starting up, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Metrics (exposed in Prometheus text format on /metrics)
+# ─────────────────────────────────────────────────────────────────────────────
+metrics = MetricsRegistry()
+job_phase_seconds = metrics.histogram(
+    "masumi_job_phase_duration_seconds",
+    "Wall-clock time spent in each phase of the job lifecycle",
+    labelnames=("phase",)
+)
+crew_task_seconds = metrics.histogram(
+    "masumi_crew_task_duration_seconds",
+    "Wall-clock time of each crew task within execute_crew_task",
+    labelnames=("task", "agent")
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Initialize Masumi Payment Config
 # ─────────────────────────────────────────────────────────────────────────────
-config = Config(
+# Every Payment sends its calls through the keep-alive pool on config.http_client
+config = PooledConfig(
     payment_service_url=PAYMENT_SERVICE_URL,
     payment_api_key=PAYMENT_API_KEY
 )
@@ -62,111 +235,135 @@ class StartJobRequest(BaseModel):
             }
         }
 
+class StartJobsRequest(BaseModel):
+    jobs: list[StartJobRequest]
+
 class ProvideInputRequest(BaseModel):
     job_id: str
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CrewAI Task Execution
 # ─────────────────────────────────────────────────────────────────────────────
-async def execute_crew_task(input_data: str, model: str = None, temperature: float = None) -> str:
-    """ Execute a CrewAI task with Research and Writing Agents """
-    logger.info(f"Starting CrewAI task with input: {input_data}")
+def resolve_llm_settings(model: str = None, temperature: float = None) -> tuple:
+    """ Returns the (model, temperature) a crew run will use """
     # Configure LLM if specified via environment variables or parameters
     llm_model = model or os.getenv("LLM_MODEL")
     # Get temperature - prefer parameter over env var
     temp_env = os.getenv("LLM_TEMPERATURE")
     llm_temperature = temperature if temperature is not None else (float(temp_env) if temp_env else None)
+    return llm_model, llm_temperature
+
+async def execute_crew_task(input_data: str, model: str = None, temperature: float = None, job_id: str = None, listener=None) -> str:
+    """ Execute a CrewAI task with Research and Writing Agents on the crew executor """
+    logger.info(f"Starting CrewAI task with input: {truncate(input_data, 200)}")
+    llm_model, llm_temperature = resolve_llm_settings(model, temperature)
     
-    if llm_model:
+    if model_router is not None:
+        logger.info("Routing LLM calls per task (LLM_ROUTE_*)")
+    elif llm_model:
         logger.info(f"Using custom LLM: {llm_model}")
         if llm_temperature is not None:
             logger.info(f"Using custom temperature: {llm_temperature}")
-            crew = ResearchCrew(logger=logger, model=llm_model, temperature=llm_temperature)
-        else:
-            crew = ResearchCrew(logger=logger, model=llm_model)
     else:
         logger.info("Using default LLM: gpt-5-nano")
-        crew = ResearchCrew(logger=logger)
+
+    # The executor's job timeout doubles as the routing deadline
+    deadline = time.time() + crew_executor.job_timeout if crew_executor.job_timeout else None
     
-    inputs = {"text": input_data}
-    result = crew.crew.kickoff(inputs)
+    # kickoff() is blocking, so run it in the worker pool to keep the event loop free
+    # (progress listeners cannot cross a process boundary, so they only apply in thread mode)
+    from crew_definition import kickoff_research_crew, kickoff_research_crew_raw
+    job_key = job_id or str(uuid.uuid4())
+    if crew_executor.mode == "process":
+        result = await crew_executor.submit(job_key, kickoff_research_crew_raw, input_data, llm_model, llm_temperature, deadline)
+    else:
+        result = await crew_executor.submit(job_key, kickoff_research_crew, input_data, llm_model, llm_temperature, listener, deadline)
     logger.info("CrewAI task completed successfully")
     return result
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 1) Start Job (MIP-003: /start_job)
 # ─────────────────────────────────────────────────────────────────────────────
+async def create_job(data: StartJobRequest) -> dict:
+    """
+    Creates a payment request for one job, stores the job and registers it with the payment poller
+
+    Args:
+        data: The job's input and purchaser identifier
+
+    Returns:
+        The MIP-003 /start_job response for the job
+    """
+    job_id = str(uuid.uuid4())
+    bind_log_context(job_id=job_id)
+    logger.debug(f"Received data: {truncate(data)}")
+    agent_identifier = os.getenv("AGENT_IDENTIFIER")
+    
+    # Log the input text (truncate if too long)
+    input_text = data.input_data["text"]
+    truncated_input = input_text[:100] + "..." if len(input_text) > 100 else input_text
+    logger.info(f"Received job request with input: '{truncated_input}'")
+    logger.info(f"Starting job {job_id} with agent {agent_identifier}")
+
+    # Define payment amounts
+    payment_amount = os.getenv("PAYMENT_AMOUNT", "10000000")  # Default 10 ADA
+    payment_unit = os.getenv("PAYMENT_UNIT", "lovelace") # Default lovelace
+
+    amounts = [Amount(amount=payment_amount, unit=payment_unit)]
+    logger.info(f"Using payment amount: {payment_amount} {payment_unit}")
+    
+    # Create a payment request using Masumi
+    payment = Payment(
+        agent_identifier=agent_identifier,
+        #amounts=amounts,
+        config=config,
+        identifier_from_purchaser=data.identifier_from_purchaser,
+        input_data=data.input_data,
+        network=NETWORK
+    )
+    
+    logger.info("Creating payment request...")
+    with job_phase_seconds.time(phase="create_payment_request"):
+        payment_request = await payment.create_payment_request()
+    blockchain_identifier = payment_request["data"]["blockchainIdentifier"]
+    payment.payment_ids.add(blockchain_identifier)
+    logger.info(f"Created payment request with blockchain identifier: {blockchain_identifier}")
+
+    # Store job info (Awaiting payment)
+    job_store.create(
+        job_id,
+        status="awaiting_payment",
+        payment_status="pending",
+        blockchain_identifier=blockchain_identifier,
+        input_data=data.input_data,
+        identifier_from_purchaser=data.identifier_from_purchaser
+    )
+
+    # Register the payment with the shared poller
+    watch_payment(job_id, payment, blockchain_identifier)
+
+    # Return the response in the required format
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "blockchainIdentifier": blockchain_identifier,
+        "submitResultTime": payment_request["data"]["submitResultTime"],
+        "unlockTime": payment_request["data"]["unlockTime"],
+        "externalDisputeUnlockTime": payment_request["data"]["externalDisputeUnlockTime"],
+        "agentIdentifier": agent_identifier,
+        "sellerVKey": os.getenv("SELLER_VKEY"),
+        "identifierFromPurchaser": data.identifier_from_purchaser,
+        "amounts": amounts,
+        "input_hash": payment.input_hash,
+        "payByTime": payment_request["data"]["payByTime"],
+    }
+
 @app.post("/start_job")
 async def start_job(data: StartJobRequest):
     """ Initiates a job and creates a payment request """
-    print(f"Received data: {data}")
-    print(f"Received data.input_data: {data.input_data}")
+    require_crew_ready()
     try:
-        job_id = str(uuid.uuid4())
-        agent_identifier = os.getenv("AGENT_IDENTIFIER")
-        
-        # Log the input text (truncate if too long)
-        input_text = data.input_data["text"]
-        truncated_input = input_text[:100] + "..." if len(input_text) > 100 else input_text
-        logger.info(f"Received job request with input: '{truncated_input}'")
-        logger.info(f"Starting job {job_id} with agent {agent_identifier}")
-
-        # Define payment amounts
-        payment_amount = os.getenv("PAYMENT_AMOUNT", "10000000")  # Default 10 ADA
-        payment_unit = os.getenv("PAYMENT_UNIT", "lovelace") # Default lovelace
-
-        amounts = [Amount(amount=payment_amount, unit=payment_unit)]
-        logger.info(f"Using payment amount: {payment_amount} {payment_unit}")
-        
-        # Create a payment request using Masumi
-        payment = Payment(
-            agent_identifier=agent_identifier,
-            #amounts=amounts,
-            config=config,
-            identifier_from_purchaser=data.identifier_from_purchaser,
-            input_data=data.input_data,
-            network=NETWORK
-        )
-        
-        logger.info("Creating payment request...")
-        payment_request = await payment.create_payment_request()
-        blockchain_identifier = payment_request["data"]["blockchainIdentifier"]
-        payment.payment_ids.add(blockchain_identifier)
-        logger.info(f"Created payment request with blockchain identifier: {blockchain_identifier}")
-
-        # Store job info (Awaiting payment)
-        jobs[job_id] = {
-            "status": "awaiting_payment",
-            "payment_status": "pending",
-            "blockchain_identifier": blockchain_identifier,
-            "input_data": data.input_data,
-            "result": None,
-            "identifier_from_purchaser": data.identifier_from_purchaser
-        }
-
-        async def payment_callback(blockchain_identifier: str):
-            await handle_payment_status(job_id, blockchain_identifier)
-
-        # Start monitoring the payment status
-        payment_instances[job_id] = payment
-        logger.info(f"Starting payment status monitoring for job {job_id}")
-        await payment.start_status_monitoring(payment_callback)
-
-        # Return the response in the required format
-        return {
-            "status": "success",
-            "job_id": job_id,
-            "blockchainIdentifier": blockchain_identifier,
-            "submitResultTime": payment_request["data"]["submitResultTime"],
-            "unlockTime": payment_request["data"]["unlockTime"],
-            "externalDisputeUnlockTime": payment_request["data"]["externalDisputeUnlockTime"],
-            "agentIdentifier": agent_identifier,
-            "sellerVKey": os.getenv("SELLER_VKEY"),
-            "identifierFromPurchaser": data.identifier_from_purchaser,
-            "amounts": amounts,
-            "input_hash": payment.input_hash,
-            "payByTime": payment_request["data"]["payByTime"],
-        }
+        return await create_job(data)
     except KeyError as e:
         logger.error(f"Missing required field in request: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -180,50 +377,414 @@ async def start_job(data: StartJobRequest):
             detail="Input_data or identifier_from_purchaser is missing, invalid, or does not adhere to the schema."
         )
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 1b) Start Jobs in Bulk (/start_jobs)
+# ─────────────────────────────────────────────────────────────────────────────
+START_JOBS_MAX_ITEMS = int(os.getenv("START_JOBS_MAX_ITEMS", "100"))
+START_JOBS_CONCURRENCY = int(os.getenv("START_JOBS_CONCURRENCY", "50"))
+
+@app.post("/start_jobs")
+async def start_jobs(data: StartJobsRequest):
+    """
+    Starts many jobs in one request
+
+    Payment requests are created concurrently (at most START_JOBS_CONCURRENCY
+    in flight), so a batch costs about as much as its slowest few round trips
+    rather than one round trip per job. Every created job is tracked by the
+    shared payment poller, exactly like a job from /start_job. One job failing
+    does not fail the batch: results keep the request order and carry either
+    the /start_job response or an error for each item.
+    """
+    require_crew_ready()
+    if not data.jobs:
+        raise HTTPException(status_code=400, detail="jobs must contain at least one job")
+    if len(data.jobs) > START_JOBS_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {START_JOBS_MAX_ITEMS} jobs can be started per request, got {len(data.jobs)}"
+        )
+
+    semaphore = asyncio.Semaphore(START_JOBS_CONCURRENCY)
+
+    async def start_one(index: int, item: StartJobRequest) -> dict:
+        async with semaphore:
+            try:
+                return {"index": index, **await create_job(item)}
+            except KeyError as e:
+                logger.warning(f"Job {index} of batch is missing a required field: {str(e)}")
+                return {"index": index, "status": "error", "error": f"Missing required field: {str(e)}"}
+            except Exception as e:
+                logger.error(f"Error starting job {index} of batch: {str(e)}", exc_info=True)
+                return {"index": index, "status": "error", "error": str(e)}
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(start_one(index, item) for index, item in enumerate(data.jobs)))
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    logger.info(
+        f"Started {succeeded}/{len(results)} jobs in batch in "
+        f"{round((time.perf_counter() - start) * 1000, 2)} ms"
+    )
+    return {
+        "status": "success" if succeeded == len(results) else ("partial" if succeeded else "error"),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 2) Process Payment and Execute AI Task
 # ─────────────────────────────────────────────────────────────────────────────
 async def handle_payment_status(job_id: str, payment_id: str) -> None:
     """ Executes CrewAI task after payment confirmation """
+    bind_log_context(job_id=job_id, blockchain_identifier=payment_id)
     try:
         logger.info(f"Payment {payment_id} completed for job {job_id}, executing task...")
         
         # Update job status to running
-        jobs[job_id]["status"] = "running"
-        logger.info(f"Input data: {jobs[job_id]["input_data"]}")
+        job_store.update(job_id, status="running", worker=WORKER_ID)
+        job_events.publish(job_id, "running")
+        job = job_store.get(job_id)
+        input_data = job["input_data"]
+        job_phase_seconds.observe(time.time() - job["created_at"], phase="awaiting_payment")
+        logger.info(f"Input data: {truncate(input_data, 200)}")
 
-        # Execute the AI task
-        result = await execute_crew_task(jobs[job_id]["input_data"])
-        print(f"Result: {result}")
-        logger.info(f"Crew task completed for job {job_id}")
-        
-        # Convert result to string for payment completion
-        # Check if result has .raw attribute (CrewOutput), otherwise convert to string
-        result_string = result.raw if hasattr(result, "raw") else str(result)
+        # Reuse a fresh cached result for the same input and crew configuration
+        from crew_definition import crew_config_fingerprint
+        crew_config = {"crew": crew_config_fingerprint(*resolve_llm_settings())}
+        result_key = ResultCache.make_key(
+            payment_instances[job_id].input_hash,
+            input_data,
+            crew_config,
+            scope=RESULT_CACHE_SCOPE
+        )
+        result_string = result_cache.get(result_key) if result_cache is not None else None
+        if job["result"] is not None:
+            # An earlier delivery ran the crew but stopped before the job completed
+            result_string = job["result"]
+            logger.info(f"Job {job_id} already has a result, submitting it without running the crew")
+        elif result_string is not None:
+            logger.info(f"Result cache hit for job {job_id}, skipping crew run")
+        else:
+            # Execute the AI task, joining an identical run if one is in flight
+            def run_crew(publish):
+                task_started_at = {}
+
+                def observe_progress(event, **details):
+                    # Runs in the crew worker thread, once per run however many jobs share it
+                    if event == "task_started":
+                        task_started_at[details["task"]] = time.perf_counter()
+                    elif event == "task_finished" and details["task"] in task_started_at:
+                        crew_task_seconds.observe(
+                            time.perf_counter() - task_started_at.pop(details["task"]),
+                            task=details["task"],
+                            agent=details["agent"]
+                        )
+                    publish(event, **details)
+
+                return execute_crew_task(input_data, job_id=job_id, listener=observe_progress)
+
+            def publish_progress(event, **details):
+                # Every job sharing the run gets its progress events
+                job_events.publish_threadsafe(job_id, event, **details)
+
+            # Keyed on the input itself, whatever RESULT_CACHE_SCOPE is: input_hash is
+            # salted per purchaser, but every job still completes its own payment
+            flight_key = ResultCache.make_key(None, input_data, crew_config, scope="content")
+            with log_phase(logger, "execute_crew_task"), job_phase_seconds.time(phase="execute_crew_task"):
+                result = await crew_flights.do(flight_key, run_crew, listener=publish_progress)
+            logger.info(f"Crew task completed for job {job_id}")
+            logger.debug(f"Result: {truncate(result)}")
+            
+            # Convert result to string for payment completion
+            # Check if result has .raw attribute (CrewOutput), otherwise convert to string
+            result_string = result.raw if hasattr(result, "raw") else str(result)
+            if result_cache is not None:
+                result_cache.put(result_key, result_string)
         
+        # Keep the result before submitting it: a delivery that dies from here on
+        # is retried with this result instead of running the crew again
+        # (/status only reports a result once the job is completed)
+        job_store.update(job_id, result=result_string)
+
         # Mark payment as completed on Masumi
         # Use a shorter string for the result hash
-        await payment_instances[job_id].complete_payment(payment_id, result_string)
+        with log_phase(logger, "complete_payment"), job_phase_seconds.time(phase="complete_payment"):
+            try:
+                await payment_instances[job_id].complete_payment(payment_id, result_string)
+            except Exception as e:
+                # An earlier delivery may have submitted it before it died
+                if not await payment_instances[job_id].is_result_submitted(payment_id):
+                    raise
+                logger.info(f"Result for job {job_id} was already submitted ({str(e)})")
         logger.info(f"Payment completed for job {job_id}")
 
-        # Update job status
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["payment_status"] = "completed"
-        jobs[job_id]["result"] = result
+        # Update job status (only the raw string is kept, not the CrewOutput)
+        job_store.update(job_id, status="completed", payment_status="completed", result=result_string)
+        job_events.publish(job_id, "completed", result=result_string)
 
-        # Stop monitoring payment status
-        if job_id in payment_instances:
-            payment_instances[job_id].stop_status_monitoring()
-            del payment_instances[job_id]
+        # Stop tracking payment status
+        payment_poller.untrack(job_id)
+        payment_status_cache.forget(job_id)
+        payment_instances.pop(job_id, None)
     except Exception as e:
-        print(f"Error processing payment {payment_id} for job {job_id}: {str(e)}")
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        if isinstance(e, CrewCancelledError) and crew_executor.closed:
+            # Stopped by shutdown, not by the job: run_queued_job gives it back to the queue
+            raise asyncio.CancelledError() from e
+        logger.error(f"Error processing payment {payment_id} for job {job_id}: {str(e)}", exc_info=True)
+        job_store.update(job_id, status="failed", error=str(e))
+        job_events.publish(job_id, "failed", error=str(e))
         
-        # Still stop monitoring to prevent repeated failures
-        if job_id in payment_instances:
-            payment_instances[job_id].stop_status_monitoring()
-            del payment_instances[job_id]
+        # Still stop tracking to prevent repeated failures
+        payment_poller.untrack(job_id)
+        payment_status_cache.forget(job_id)
+        payment_instances.pop(job_id, None)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Payment Poller (one batched status loop for all jobs awaiting payment)
+# ─────────────────────────────────────────────────────────────────────────────
+async def queue_paid_job(job_id: str, payment_id: str) -> None:
+    """ Hands a confirmed job to the work queue, from which the next free crew worker takes it """
+    job_store.update(job_id, status="paid", payment_status="FundsLocked")
+    work_queue.enqueue(job_id, {"blockchain_identifier": payment_id})
+    payment_poller.untrack(job_id)
+    payment_status_cache.forget(job_id)
+    payment_instances.pop(job_id, None)
+    logger.info(f"Payment {payment_id} confirmed, job {job_id} queued for a worker")
+    # Let a consumer in this process take it right away if it has a free slot
+    work_ready.set()
+
+def on_payment_state_change(job_id: str, state: str) -> None:
+    # Stored so that every worker's /status sees what the poller observed
+    job_store.update(job_id, payment_status=state)
+    job_events.publish(job_id, "payment", payment_status=state)
+
+def expire_unpaid_job(job_id: str) -> None:
+    """ Fails a job whose payment never arrived, so that retention purges it """
+    error = "Payment was not received in time"
+    job_store.update(job_id, status="failed", payment_status="expired", error=error)
+    job_events.publish(job_id, "failed", error=error)
+    payment_status_cache.forget(job_id)
+    payment_instances.pop(job_id, None)
+    logger.info(f"Job {job_id} failed: {error}")
+
+payment_poller = PaymentPoller.from_env(
+    payment_instances,
+    queue_paid_job,
+    on_state_change=on_payment_state_change,
+    on_expired=expire_unpaid_job
+)
+
+def payment_for_job(job: dict) -> Payment:
+    """ Rebuilds the masumi Payment of a stored job (without input_data it can only check the status) """
+    payment = Payment(
+        agent_identifier=os.getenv("AGENT_IDENTIFIER"),
+        config=config,
+        identifier_from_purchaser=job["identifier_from_purchaser"],
+        input_data=job.get("input_data"),
+        network=NETWORK
+    )
+    payment.payment_ids.add(job["blockchain_identifier"])
+    return payment
+
+def watch_payment(job_id: str, payment: Payment, blockchain_identifier: str) -> None:
+    """ Tracks a new job's payment, unless another worker runs the poller """
+    if CLUSTER_MODE and not leader_election.is_leader:
+        # The leader picks the job up from the job store
+        return
+    payment_instances[job_id] = payment
+    logger.info(f"Tracking payment status for job {job_id}")
+    payment_poller.track(job_id, blockchain_identifier)
+
+async def start_payment_poller():
+    job_events.bind_loop(asyncio.get_running_loop())
+    if CREW_WORKERS != "external":
+        app.state.consumer_task = asyncio.create_task(consume_work_queue())
+    if CLUSTER_MODE:
+        leader_election.start()
+        logger.info(f"API worker {WORKER_ID} started ({API_WORKERS} workers)")
+        return
+    restore_pending_jobs()
+    payment_poller.start()
+    app.state.retention_task = asyncio.create_task(run_retention(job_store, JOB_TTL_SECONDS))
+
+def recover_unqueued_jobs():
+    """ Queues paid jobs that never reached the queue and fails running jobs without a queue message """
+    queued = work_queue.job_ids()
+    for job in job_store.find(status="paid"):
+        if job["job_id"] not in queued:
+            work_queue.enqueue(job["job_id"], {"blockchain_identifier": job["blockchain_identifier"]})
+    # Jobs being run from the queue are retried by it; others (e.g. started
+    # before the queue existed) cannot be resumed
+    interrupted = [job["job_id"] for job in job_store.find(status="running") if job["job_id"] not in queued]
+    if interrupted:
+        job_store.set_status(interrupted, "failed", error="Interrupted by server restart")
+        logger.warning(f"Marked {len(interrupted)} interrupted jobs as failed")
+
+# Newest created_at read by track_pending_jobs; later syncs only read jobs
+# from a little before it, in case a job committed after a newer one
+pending_synced_until = 0.0
+PENDING_SYNC_OVERLAP = 5.0
+
+def track_pending_jobs() -> int:
+    """ Tracks jobs awaiting payment created since the last sync that the poller does not know yet """
+    global pending_synced_until
+    recent = job_store.find_created_after("awaiting_payment", pending_synced_until - PENDING_SYNC_OVERLAP)
+    if recent:
+        pending_synced_until = max(pending_synced_until, recent[-1]["created_at"])
+    pending = [job for job in recent if job["job_id"] not in payment_instances]
+    for job in pending:
+        payment_instances[job["job_id"]] = payment_for_job(job)
+        payment_poller.track(job["job_id"], job["blockchain_identifier"], created_at=job["created_at"])
+    return len(pending)
+
+def restore_pending_jobs():
+    """ Re-attaches jobs persisted before a restart """
+    recover_unqueued_jobs()
+    restored = track_pending_jobs()
+    if restored:
+        logger.info(f"Restored payment tracking for {restored} jobs awaiting payment")
+
+async def lead_cluster():
+    """ Runs the payment poller and job upkeep on the elected worker """
+    try:
+        restore_pending_jobs()
+        payment_poller.start()
+        app.state.retention_task = asyncio.create_task(run_retention(job_store, JOB_TTL_SECONDS))
+        while True:
+            await asyncio.sleep(CLUSTER_POLL_INTERVAL)
+            try:
+                # Jobs started on other workers
+                track_pending_jobs()
+            except Exception as e:
+                logger.error(f"Error syncing jobs from the job store: {str(e)}", exc_info=True)
+    except Exception:
+        # The election hands leadership on; the next leader restores from the job store
+        await step_down()
+        raise
+
+async def step_down():
+    """ Stops the leader-only work of this worker """
+    global pending_synced_until
+    await payment_poller.stop()
+    for job_id in payment_poller.untrack_all():
+        payment_instances.pop(job_id, None)
+    pending_synced_until = 0.0
+    retention_task = getattr(app.state, "retention_task", None)
+    if retention_task is not None:
+        retention_task.cancel()
+
+leader_election = LeaderElection(os.path.join(CLUSTER_DIR, "leader.lock"), lead_cluster) if CLUSTER_MODE else None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Work Queue Consumer (API processes, or `python main.py worker`)
+# ─────────────────────────────────────────────────────────────────────────────
+work_ready = asyncio.Event()
+# Delivered jobs this process is running: {task: queue message}
+in_flight_jobs = {}
+
+async def consume_work_queue():
+    """ Runs queued jobs while this process has free crew slots """
+    await crew_ready.wait()
+    while True:
+        try:
+            free = crew_executor.max_workers - len(in_flight_jobs)
+            if free > 0:
+                for message in work_queue.receive(WORKER_ID, limit=free):
+                    task = asyncio.create_task(run_queued_job(message))
+                    in_flight_jobs[task] = message
+                    task.add_done_callback(lambda done: in_flight_jobs.pop(done, None))
+        except Exception as e:
+            logger.error(f"Error receiving from the work queue: {str(e)}", exc_info=True)
+        work_ready.clear()
+        try:
+            await asyncio.wait_for(work_ready.wait(), timeout=WORK_QUEUE_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+async def keep_message_hidden(message) -> None:
+    """ Extends a delivery's visibility timeout for as long as its job runs """
+    while True:
+        await asyncio.sleep(work_queue.visibility_timeout / 3)
+        if not work_queue.extend(message.receipt):
+            logger.warning(f"Lost the queue delivery of job {message.job_id}, it may run again elsewhere")
+            return
+
+async def run_queued_job(message) -> None:
+    """ Runs one delivered job and acks it; a job whose process dies is delivered again """
+    job_id = message.job_id
+    bind_log_context(job_id=job_id)
+    job = job_store.get(job_id)
+    if job is None or job["status"] in ("completed", "failed"):
+        # Finished by an earlier delivery that could not ack in time
+        work_queue.ack(message.receipt)
+        return
+    if message.attempts > WORK_QUEUE_MAX_ATTEMPTS:
+        error = f"Gave up after {message.attempts - 1} interrupted attempts"
+        logger.error(f"{error} for job {job_id}")
+        job_store.update(job_id, status="failed", error=error)
+        job_events.publish(job_id, "failed", error=error)
+        work_queue.ack(message.receipt)
+        return
+    if message.attempts > 1:
+        logger.warning(f"Retrying job {job_id} (attempt {message.attempts} of {WORK_QUEUE_MAX_ATTEMPTS})")
+
+    heartbeat = asyncio.create_task(keep_message_hidden(message))
+    try:
+        payment_instances[job_id] = payment_for_job(job)
+        # Marks the job completed or failed itself
+        await handle_payment_status(job_id, message.payload.get("blockchain_identifier") or job["blockchain_identifier"])
+        work_queue.ack(message.receipt)
+    except asyncio.CancelledError:
+        # Shutting down: give the job back so another worker picks it up at once
+        work_queue.nack(message.receipt)
+        raise
+    finally:
+        heartbeat.cancel()
+
+async def stop_consuming(consumer) -> None:
+    """ Stops taking jobs and gives the running ones back to the queue (before the executor and queue are shut down) """
+    consumer.cancel()
+    running = dict(in_flight_jobs)
+    for task in running:
+        task.cancel()
+    await asyncio.gather(consumer, *running, return_exceptions=True)
+    # A task cancelled before it started never reached its own nack; nacking twice is a no-op
+    for message in running.values():
+        work_queue.nack(message.receipt)
+    if running:
+        logger.info(f"Returned {len(running)} unfinished jobs to the work queue")
+
+async def run_worker():
+    """ Runs crews from the work queue without serving the API (python main.py worker) """
+    loop = asyncio.get_running_loop()
+    job_events.bind_loop(loop)
+    await warm_up()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    consumer = asyncio.create_task(consume_work_queue())
+    logger.info(f"Crew worker {WORKER_ID} started with {crew_executor.max_workers} crew slots")
+    await stopping.wait()
+    logger.info(f"Crew worker {WORKER_ID} stopping")
+    await stop_consuming(consumer)
+    crew_executor.shutdown()
+    await config.http_client.aclose()
+    job_store.close()
+    work_queue.close()
+
+async def stop_payment_poller():
+    app.state.warm_up_task.cancel()
+    if CREW_WORKERS != "external":
+        await stop_consuming(app.state.consumer_task)
+    crew_executor.shutdown()
+    if CLUSTER_MODE:
+        await leader_election.stop()
+    await payment_poller.stop()
+    await config.http_client.aclose()
+    work_queue.close()
+    job_store.close()
+    if result_cache is not None:
+        result_cache.close()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3) Check Job and Payment Status (MIP-003: /status)
@@ -231,46 +792,224 @@ async def handle_payment_status(job_id: str, payment_id: str) -> None:
 @app.get("/status")
 async def get_status(job_id: str):
     """ Retrieves the current status of a specific job """
-    logger.info(f"Checking status for job {job_id}")
-    if job_id not in jobs:
+    bind_log_context(job_id=job_id)
+    # Status polls are high-frequency, so these records are sampled (LOG_SAMPLE_RATES)
+    logger.info(f"Checking status for job {job_id}", extra={"sampled": True})
+    job_status = job_store.get_status(job_id)
+    if job_status is None:
         logger.warning(f"Job {job_id} not found")
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
+    status, payment_status = job_status
+    # Paid jobs waiting for a worker are reported as running, as MIP-003 has no such state
+    status = "running" if status == "paid" else status
+    payment_status_age = None
 
     # Check latest payment status if payment instance exists
+    # (served from the shared cache or the poller when fresh enough)
     if job_id in payment_instances:
+        stored_payment_status = payment_status
         try:
-            status = await payment_instances[job_id].check_payment_status()
-            job["payment_status"] = status.get("data", {}).get("status")
-            logger.info(f"Updated payment status for job {job_id}: {job['payment_status']}")
+            observed, payment_status_age = await payment_status_cache.get(
+                job_id,
+                lambda: fetch_payment_status(job_id),
+                known=payment_poller.last_status.get(job_id)
+            )
+            # Nothing on chain yet: keep reporting what the store has
+            payment_status = observed or stored_payment_status or "pending"
+            logger.info(f"Updated payment status for job {job_id}: {payment_status}", extra={"sampled": True})
+            # Written only on change, so cached polls stay off the database
+            if observed is not None and observed != stored_payment_status:
+                job_store.update(job_id, payment_status=observed)
         except ValueError as e:
             logger.warning(f"Error checking payment status: {str(e)}")
-            job["payment_status"] = "unknown"
+            payment_status = "unknown"
         except Exception as e:
             logger.error(f"Error checking payment status: {str(e)}", exc_info=True)
-            job["payment_status"] = "error"
-
+            payment_status = "error"
 
-    result_data = job.get("result")
-    logger.info(f"Result data: {result_data}")
-    result = result_data.raw if result_data and hasattr(result_data, "raw") else None
+    # Only completed jobs carry a result, so skip the full row otherwise
+    result = job_store.get(job_id)["result"] if status == "completed" else None
+    logger.debug("Result data: %s", result)
 
+    return {
+        "job_id": job_id,
+        "status": status,
+        "payment_status": payment_status,
+        "payment_status_age": round(payment_status_age, 3) if payment_status_age is not None else None,
+        "result": result
+    }
 
+async def fetch_payment_status(job_id: str) -> str:
+    """ Looks up the on-chain state of a job's payment on the payment service """
+    payment = payment_instances[job_id]
+    blockchain_identifier = job_store.get(job_id)["blockchain_identifier"]
+    payment_check = await payment.check_payment_status_by_identifier(blockchain_identifier)
+    return (payment_check.get("data") or {}).get("onChainState")
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 3b) Stream Job Status (Server-Sent Events / WebSocket)
+# ─────────────────────────────────────────────────────────────────────────────
+def job_snapshot(job_id: str) -> dict:
+    """ Returns the stored state of a job as a stream event, or None """
+    job_status = job_store.get_status(job_id)
+    if job_status is None:
+        return None
+    status, payment_status = job_status
     return {
         "job_id": job_id,
-        "status": job["status"],
-        "payment_status": job["payment_status"],
-        "result": result
+        "event": "status",
+        "status": "running" if status == "paid" else status,
+        "payment_status": payment_status,
+        "result": job_store.get(job_id)["result"] if status == "completed" else None
     }
 
+def finished_elsewhere(job_id: str) -> dict:
+    """
+    Returns the final snapshot of a job that finished without this process
+    seeing its events (another API or crew worker ran it), or None
+    """
+    if not CLUSTER_MODE and CREW_WORKERS != "external":
+        return None
+    snapshot = job_snapshot(job_id)
+    return snapshot if snapshot is not None and snapshot["status"] in TERMINAL_EVENTS else None
+
+@app.get("/status/stream")
+async def stream_status(job_id: str):
+    """ Pushes job state transitions as Server-Sent Events until the job finishes """
+    # Subscribe before reading the snapshot so no transition falls in between
+    queue = job_events.subscribe(job_id)
+    snapshot = job_snapshot(job_id)
+    if snapshot is None:
+        job_events.unsubscribe(job_id, queue)
+        logger.warning(f"Job {job_id} not found")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        try:
+            yield f"event: status\ndata: {json.dumps(snapshot)}\n\n"
+            if snapshot["status"] in TERMINAL_EVENTS:
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    finished = finished_elsewhere(job_id)
+                    if finished is not None:
+                        yield f"event: status\ndata: {json.dumps(finished)}\n\n"
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+                if message["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            job_events.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/status/ws")
+async def stream_status_ws(websocket: WebSocket, job_id: str):
+    """ WebSocket variant of /status/stream """
+    await websocket.accept()
+    queue = job_events.subscribe(job_id)
+    try:
+        snapshot = job_snapshot(job_id)
+        if snapshot is None:
+            await websocket.send_json({"job_id": job_id, "event": "error", "detail": "Job not found"})
+            await websocket.close(code=1008)
+            return
+        await websocket.send_json(snapshot)
+        if snapshot["status"] in TERMINAL_EVENTS:
+            await websocket.close()
+            return
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                finished = finished_elsewhere(job_id)
+                if finished is not None:
+                    await websocket.send_json(finished)
+                    await websocket.close()
+                    return
+                continue
+            await websocket.send_json(message)
+            if message["event"] in TERMINAL_EVENTS:
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job_events.unsubscribe(job_id, queue)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3c) Metrics (Prometheus text format)
+# ─────────────────────────────────────────────────────────────────────────────
+metrics.gauge(
+    "masumi_jobs",
+    "Jobs in the job store by status",
+    lambda: job_store.count_by_status(),
+    labelnames=("status",)
+)
+metrics.gauge(
+    "masumi_payment_instances",
+    "Payment objects held for jobs awaiting payment or running",
+    lambda: len(payment_instances)
+)
+metrics.gauge(
+    "masumi_payment_poller_pending",
+    "Payments tracked by the payment poller",
+    lambda: payment_poller.pending_count()
+)
+metrics.gauge(
+    "masumi_payment_http_in_flight",
+    "Payment service calls in flight (in_flight) and those waiting for a free pooled connection (waiting)",
+    lambda: {("in_flight",): config.http_client.stats()["in_flight"],
+             ("waiting",): config.http_client.stats()["waiting_for_connection"]},
+    labelnames=("state",)
+)
+metrics.counter(
+    "masumi_payment_http_connections_total",
+    "Connections the payment service HTTP pool has opened (opened) or reused (reused) since start",
+    lambda: {("opened",): config.http_client.stats()["connections_opened"],
+             ("reused",): config.http_client.stats()["connections_reused"]},
+    labelnames=("event",)
+)
+metrics.gauge(
+    "masumi_work_queue_messages",
+    "Work queue messages waiting for a worker (ready) or being worked on (in_flight)",
+    lambda: {(state,): count for state, count in work_queue.stats().items() if state != "redelivered"},
+    labelnames=("state",)
+)
+metrics.gauge(
+    "masumi_executor_jobs",
+    "Crew executor jobs by state",
+    lambda: {(state,): crew_executor.stats()[state] for state in ("queued", "running")},
+    labelnames=("state",)
+)
+metrics.gauge(
+    "masumi_executor_utilisation",
+    "Fraction of crew executor workers in use",
+    lambda: crew_executor.stats()["utilisation"]
+)
+
+@app.get("/metrics")
+async def get_metrics():
+    """ Returns job lifecycle metrics in Prometheus text format """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 4) Check Server Availability (MIP-003: /availability)
 # ─────────────────────────────────────────────────────────────────────────────
 @app.get("/availability")
 async def check_availability():
     """ Checks if the server is operational """
+    if not crew_ready.is_set():
+        return {"status": "unavailable", "type": "masumi-agent", "message": "Server starting up."}
 
     return {"status": "available", "type": "masumi-agent", "message": "Server operational."}
     # Commented out for simplicity sake but its recommended to include the agentIdentifier
@@ -307,8 +1046,28 @@ async def health():
     """
     Returns the health of the server.
     """
+    llm_cache = None
+    knowledge_passages = None
+    if crew_ready.is_set():
+        # Imported and opened by the warm-up, so these are only lookups;
+        # before that they could load the index on the event loop
+        from llm_cache import get_llm_cache
+        llm_cache = get_llm_cache()
+        knowledge_passages = len(get_knowledge_index() or ())
     return {
-        "status": "healthy"
+        "status": "healthy",
+        "ready": crew_ready.is_set(),
+        "warm_up": warm_up_stats,
+        "executor": crew_executor.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "coalescing": crew_flights.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "knowledge_passages": knowledge_passages,
+        "prompt_prefix": prefix_stats(),
+        "model_routing": model_router.stats() if model_router is not None else None,
+        "work_queue": work_queue.stats(),
+        "payment_http": config.http_client.stats(),
+        "logging": get_logging_stats()
     }
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -331,6 +1090,7 @@ def main():
     print("\nProcessing with CrewAI agents...\n")
     
     # Initialize and run the crew
+    from crew_definition import ResearchCrew
     crew = ResearchCrew(verbose=True)
     result = crew.crew.kickoff(inputs=input_data)
     
@@ -364,7 +1124,18 @@ if __name__ == "__main__":
         print(f"Input Schema:             http://{host}:{port}/input_schema\n")
         print("=" * 70 + "\n")
 
-        uvicorn.run(app, host=host, port=port, log_level="info")
+        if API_WORKERS > 1:
+            # Each worker process imports this module and joins the cluster on startup
+            print(f"Workers:                  {API_WORKERS}\n")
+            uvicorn.run("main:app", host=host, port=port, workers=API_WORKERS, log_level="info")
+        else:
+            uvicorn.run(app, host=host, port=port, log_level="info")
+    elif len(sys.argv) > 1 and sys.argv[1] == "worker":
+        # Run crews from the work queue (start the API with CREW_WORKERS=external)
+        print("\n" + "=" * 70)
+        print("🚀 Starting crew worker...")
+        print("=" * 70 + "\n")
+        asyncio.run(run_worker())
     else:
         # Run standalone mode
         main()
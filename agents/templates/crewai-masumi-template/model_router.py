@@ -0,0 +1,301 @@
+import os
+import time
+import threading
+from collections import deque
+from crewai import BaseLLM
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelRoute:
+    """
+    One candidate model for a task
+
+    Args:
+        model: Model name passed to crewai's LLM
+        max_input_chars: Longest prompt (in characters) the model is chosen for (None = any)
+    """
+
+    def __init__(self, model, max_input_chars=None):
+        self.model = model
+        self.max_input_chars = max_input_chars
+
+    @classmethod
+    def parse_list(cls, spec):
+        """
+        Parse "gpt-5-nano:8000,gpt-5-mini" into routes, in preference order
+
+        Raises:
+            ValueError: If the spec names no model or an entry has an empty model name
+        """
+        routes = []
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            model, separator, limit = part.rpartition(":")
+            if separator and limit.isdigit():
+                route = cls(model.strip(), int(limit))
+            else:
+                route = cls(part)
+            if not route.model:
+                raise ValueError(f"Empty model name in route list {spec!r}")
+            routes.append(route)
+        if not routes:
+            raise ValueError(f"Route list {spec!r} names no model")
+        return routes
+
+
+class ModelStats:
+    """Rolling window of call latencies and outcomes for one model"""
+
+    def __init__(self, window=50):
+        self._samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.last_observed = 0.0
+
+    def observe(self, latency, ok):
+        self._samples.append((latency, ok))
+        self.last_observed = time.monotonic()
+        self.calls += 1
+        if ok:
+            self.consecutive_errors = 0
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+
+    def latency_percentile(self, fraction):
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def error_rate(self):
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def window_size(self):
+        return len(self._samples)
+
+
+class ModelRouter:
+    """
+    Chooses a model for each LLM call from per-task candidate lists.
+
+    Candidates keep their configured preference order unless they are
+    unsuitable: the prompt is longer than their ``max_input_chars``, they are
+    cooling down after errors, or their rolling p95 latency is above
+    ``slow_seconds`` or above the time left until the job's deadline. Those
+    are only tried after every suitable model, fastest first, so a degraded
+    provider is routed around without ever leaving a call with no model.
+    Slow models are probed again once they have been avoided for
+    ``cooldown_seconds``. Statistics are shared by all crews in the process.
+    """
+
+    def __init__(self, routes, window=50, slow_seconds=30.0, max_error_rate=0.5,
+                 cooldown_seconds=30.0, min_samples=5):
+        """
+        Args:
+            routes: {task name: [ModelRoute, ...]}, with "default" used for unlisted tasks
+            window: Calls remembered per model
+            slow_seconds: p95 latency above which a model counts as degraded
+            max_error_rate: Error rate in the window that triggers a cooldown
+            cooldown_seconds: How long a failing model is avoided
+            min_samples: Calls needed before the error rate is trusted
+        """
+        self.routes = routes
+        self.window = window
+        self.slow_seconds = slow_seconds
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._chosen = {}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a router from LLM_ROUTE_* variables, or None if routing is not configured
+
+        LLM_ROUTE_MODELS is the default candidate list; LLM_ROUTE_RESEARCHER and
+        LLM_ROUTE_WRITER override it per task. Without LLM_ROUTE_MODELS, a task
+        with no list of its own is not routed (see ``routes_for``).
+
+        Raises:
+            ValueError: If a set LLM_ROUTE_* variable names no usable model
+        """
+        routes = {}
+        for task, name in (("default", "LLM_ROUTE_MODELS"), ("researcher", "LLM_ROUTE_RESEARCHER"), ("writer", "LLM_ROUTE_WRITER")):
+            spec = os.getenv(name)
+            if spec is not None and spec.strip():
+                try:
+                    routes[task] = ModelRoute.parse_list(spec)
+                except ValueError as e:
+                    raise ValueError(f"Invalid {name}: {str(e)}") from e
+        if not routes:
+            return None
+        return cls(
+            routes,
+            window=int(os.getenv("LLM_ROUTE_WINDOW", "50")),
+            slow_seconds=float(os.getenv("LLM_ROUTE_SLOW_SECONDS", "30")),
+            max_error_rate=float(os.getenv("LLM_ROUTE_MAX_ERROR_RATE", "0.5")),
+            cooldown_seconds=float(os.getenv("LLM_ROUTE_COOLDOWN_SECONDS", "30")),
+        )
+
+    def routes_for(self, task):
+        """Candidate routes for a task, falling back to the default list ([] = not routed)"""
+        return self.routes.get(task) or self.routes.get("default") or []
+
+    def _stats_for(self, model):
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = ModelStats(self.window)
+        return stats
+
+    def candidates(self, task, input_chars, remaining=None):
+        """
+        Models to try for one call, best first
+
+        Args:
+            task: Task name, e.g. "researcher"
+            input_chars: Prompt length in characters
+            remaining: Seconds left until the job's deadline (None = no deadline)
+        """
+        routes = self.routes_for(task)
+        sized = [route for route in routes if route.max_input_chars is None or input_chars <= route.max_input_chars]
+        # Nothing is sized for this prompt: fall back to the last (largest) candidate first
+        ordered = sized + [route for route in reversed(routes) if route not in sized]
+        now = time.monotonic()
+        preferred, degraded = [], []
+        with self._lock:
+            for route in ordered:
+                stats = self._stats_for(route.model)
+                # A model routed away from for a cooldown period gets probed again,
+                # otherwise its stale latency window would keep it out for good
+                p95 = stats.latency_percentile(0.95) if now - stats.last_observed < self.cooldown_seconds else 0.0
+                if (
+                    stats.cooldown_until > now
+                    or p95 > self.slow_seconds
+                    or (remaining is not None and p95 > remaining)
+                    or route not in sized
+                ):
+                    degraded.append((stats.cooldown_until > now, p95, route.model))
+                else:
+                    preferred.append(route.model)
+        degraded.sort()
+        return list(dict.fromkeys(preferred + [model for _, _, model in degraded]))
+
+    def observe(self, task, model, latency, ok):
+        """Record the outcome of one call"""
+        with self._lock:
+            stats = self._stats_for(model)
+            stats.observe(latency, ok)
+            if ok:
+                self._chosen[(task, model)] = self._chosen.get((task, model), 0) + 1
+                return
+            failing = stats.consecutive_errors >= 3 or (
+                stats.window_size() >= self.min_samples and stats.error_rate() >= self.max_error_rate
+            )
+            if failing and stats.cooldown_until <= time.monotonic():
+                stats.cooldown_until = time.monotonic() + self.cooldown_seconds
+                logger.warning(f"Model {model} is failing, avoiding it for {self.cooldown_seconds}s")
+
+    def stats(self):
+        """Per-model rolling latency, error rate and cooldown, plus calls served per task"""
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                model: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate(), 3),
+                    "p50_seconds": round(stats.latency_percentile(0.5), 3),
+                    "p95_seconds": round(stats.latency_percentile(0.95), 3),
+                    "cooling_down": stats.cooldown_until > now,
+                }
+                for model, stats in self._stats.items()
+            }
+            served = {f"{task}:{model}": count for (task, model), count in self._chosen.items()}
+        return {"models": models, "served": served}
+
+
+class RoutingLLM(BaseLLM):
+    """
+    crewai LLM that asks a ModelRouter which model to use on every call
+
+    Falls through to the next candidate when a call fails (including
+    provider timeouts), until a candidate answers or the job's deadline
+    has passed.
+
+    Args:
+        router: Shared ModelRouter
+        task: Task name this LLM serves, e.g. "researcher"
+        build_llm: Callable(model) returning a crewai LLM for that model
+    """
+
+    def __init__(self, router, task, build_llm):
+        routes = router.routes_for(task)
+        if not routes:
+            raise ValueError(f"No LLM_ROUTE_* candidates configured for {task}")
+        super().__init__(model=routes[0].model)
+        self.stop = []
+        self.router = router
+        self.task = task
+        self.build_llm = build_llm
+        self.deadline = None
+        self._llms = {}
+
+    def _llm_for(self, model):
+        llm = self._llms.get(model)
+        if llm is None:
+            llm = self._llms[model] = self.build_llm(model)
+        return llm
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        text = messages if isinstance(messages, str) else "".join(str(m.get("content", "")) for m in messages)
+        remaining = self.deadline - time.time() if self.deadline is not None else None
+        last_error = None
+        for model in self.router.candidates(self.task, len(text), remaining):
+            if self.deadline is not None and time.time() >= self.deadline and last_error is not None:
+                break
+            llm = self._llm_for(model)
+            # Agents add their stop words to the LLM they were given; pass them on
+            llm.stop = self.stop
+            start = time.monotonic()
+            try:
+                response = llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+            except Exception as e:
+                self.router.observe(self.task, model, time.monotonic() - start, ok=False)
+                logger.warning(f"Model {model} failed for {self.task}, trying the next candidate: {str(e)}")
+                last_error = e
+                continue
+            self.router.observe(self.task, model, time.monotonic() - start, ok=True)
+            self.model = model
+            return response
+        raise last_error or RuntimeError(f"No model available for {self.task}")
+
+    def supports_function_calling(self):
+        return self._llm_for(self.model).supports_function_calling()
+
+    def supports_stop_words(self):
+        return self._llm_for(self.model).supports_stop_words()
+
+    def get_context_window_size(self):
+        return min(self._llm_for(route.model).get_context_window_size()
+                   for route in self.router.routes_for(self.task))
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_model_router():
+    """Process-wide router from the environment, or None when routing is not configured"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter.from_env() or False
+        return _router or None
@@ -0,0 +1,303 @@
+import os
+import time
+import json
+import asyncio
+from datetime import datetime, timezone, timedelta
+import aiohttp
+from masumi.config import Config
+from masumi.payment import Payment
+from masumi.helper_functions import create_masumi_output_hash
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _masumi_time(hours):
+    """A UTC timestamp ``hours`` from now in the format the payment service expects"""
+    moment = datetime.now(timezone.utc) + timedelta(hours=hours)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class PaymentHttpClient:
+    """
+    One keep-alive HTTP connection pool for every call to the payment service.
+
+    masumi's Payment opens a new aiohttp session, and so a new TCP (and TLS)
+    connection, for each call. This client holds one session for the whole
+    process instead, so calls reuse idle connections. Connection events are
+    counted through aiohttp's tracing hooks to report pool saturation.
+    """
+
+    def __init__(self, max_connections=20, keepalive_expiry=30.0, timeout=30.0):
+        """
+        Args:
+            max_connections: Connections open at once; further calls queue for one
+            keepalive_expiry: Seconds an idle connection is kept
+            timeout: Seconds a call may take in total
+        """
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._session = None
+        self._in_flight = 0
+        self._queued = 0
+        self._counters = {
+            "requests": 0, "errors": 0, "connections_opened": 0, "connections_reused": 0,
+            "queued_for_connection": 0, "peak_in_flight": 0,
+        }
+        self._seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_connections=int(os.getenv("PAYMENT_HTTP_MAX_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("PAYMENT_HTTP_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("PAYMENT_HTTP_TIMEOUT", "30")),
+        )
+
+    def _open(self):
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            self._counters["connections_opened"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self._counters["connections_reused"] += 1
+
+        async def on_connection_queued_start(session, context, params):
+            self._counters["queued_for_connection"] += 1
+            self._queued += 1
+
+        async def on_connection_queued_end(session, context, params):
+            self._queued -= 1
+
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_connection_queued_start.append(on_connection_queued_start)
+        trace.on_connection_queued_end.append(on_connection_queued_end)
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_expiry)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[trace],
+        )
+        logger.info(f"Payment HTTP pool opened (max {self.max_connections} connections)")
+
+    async def request(self, method, url, **kwargs):
+        """
+        Send a request through the pool
+
+        Returns:
+            (status code, response body text), whatever the status code
+
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: The call could not be completed
+        """
+        if self._session is None or self._session.closed:
+            self._open()
+        self._in_flight += 1
+        self._counters["requests"] += 1
+        self._counters["peak_in_flight"] = max(self._counters["peak_in_flight"], self._in_flight)
+        started = time.perf_counter()
+        try:
+            async with self._session.request(method, url, **kwargs) as response:
+                return response.status, await response.text()
+        except Exception:
+            self._counters["errors"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._seconds += time.perf_counter() - started
+
+    def stats(self):
+        requests = self._counters["requests"]
+        return {
+            **self._counters,
+            "in_flight": self._in_flight,
+            "waiting_for_connection": self._queued,
+            "max_connections": self.max_connections,
+            "saturation": round(min(self._in_flight, self.max_connections) / self.max_connections, 3),
+            "mean_ms": round(self._seconds / requests * 1000, 1) if requests else None,
+        }
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class PooledConfig(Config):
+    """
+    masumi Config that also carries the shared PaymentHttpClient
+
+    Args:
+        http_client: Pool for payment service calls (default: from PAYMENT_HTTP_*)
+    """
+
+    def __init__(self, *args, http_client=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_client = http_client if http_client is not None else PaymentHttpClient.from_env()
+
+
+class PooledPayment(Payment):
+    """
+    masumi Payment whose service calls go through ``config.http_client``.
+
+    Requests, responses and errors match masumi's own implementation in the
+    version pinned in requirements.txt; check them against the new release
+    whenever that pin is raised. Calls the template does not use (purchases,
+    refunds) keep masumi's own per-call sessions.
+    """
+
+    # On-chain states a payment reaches only after its result was submitted
+    RESULT_SUBMITTED_STATES = {"ResultSubmitted", "Withdrawn", "Disputed", "DisputedWithdrawn"}
+    RESULT_SUBMITTING_ACTIONS = {"SubmitResultRequested", "SubmitResultInitiated"}
+
+    async def _send(self, method, path, action, **kwargs):
+        status, body = await self.config.http_client.request(
+            method, f"{self.config.payment_service_url}{path}", headers=self._headers, **kwargs
+        )
+        if status == 400:
+            raise ValueError(f"Bad request: {body}")
+        if status == 401:
+            raise ValueError("Unauthorized: Invalid API key")
+        if status == 500:
+            raise Exception("Internal server error")
+        if status != 200:
+            logger.error(f"{action} failed with status {status}: {body}")
+            raise Exception(f"{action} failed: {body}")
+        return json.loads(body)
+
+    async def create_payment_request(self, metadata=None):
+        """Create a payment request due in 12 hours; see masumi's Payment.create_payment_request"""
+        payload = {
+            "agentIdentifier": self.agent_identifier,
+            "network": self.network,
+            "paymentType": self.payment_type,
+            "payByTime": _masumi_time(12),
+            "submitResultTime": _masumi_time(24),
+            "identifierFromPurchaser": self.identifier_from_purchaser,
+        }
+        if self.input_hash:
+            payload["inputHash"] = self.input_hash
+        if metadata:
+            payload["metadata"] = metadata
+        result = await self._send("POST", "/payment/", "Payment request", json=payload)
+        self.payment_ids.add(result["data"]["blockchainIdentifier"])
+        result["time_values"] = {
+            name: result["data"][name]
+            for name in ("payByTime", "submitResultTime", "unlockTime", "externalDisputeUnlockTime")
+        }
+        return result
+
+    async def check_payment_status(self, limit=100, blockchain_identifiers=None):
+        """
+        List payments on the network until the wanted ones are found; see masumi's Payment.check_payment_status
+
+        Unlike masumi, paging stops as soon as every wanted payment has been
+        listed. The listing is newest first, so recent payments are found on
+        the first page, but a payment is never given up on: paging continues
+        to the end of the history until it is found.
+
+        Args:
+            limit: Payments per page
+            blockchain_identifiers: Payments to look for (default: this payment's own ids)
+
+        Returns:
+            The payment service response with the pages read combined
+        """
+        payments = []
+        wanted = set(blockchain_identifiers) if blockchain_identifiers is not None else set(self.payment_ids)
+        if not wanted:
+            return {"status": "success", "data": {"Payments": payments}}
+        cursor_id = None
+        while True:
+            params = {"network": self.network, "limit": limit}
+            if cursor_id:
+                params["cursorId"] = cursor_id
+            result = await self._send("GET", "/payment/", "Status check", params=params)
+            page = result.get("data", {}).get("Payments", [])
+            payments.extend(page)
+            wanted.difference_update(p.get("blockchainIdentifier") for p in page)
+            cursor_id = result.get("data", {}).get("cursorId")
+            if not wanted or not cursor_id or len(page) < limit:
+                break
+        return {"status": "success", "data": {"Payments": payments}}
+
+    async def check_payment_status_by_identifier(self, blockchain_identifier):
+        """
+        Look up one payment; see masumi's Payment.check_payment_status_by_identifier
+
+        Returns:
+            The payment service response; ``data`` is None when the service
+            does not know the payment (yet)
+        """
+        if not blockchain_identifier:
+            raise ValueError("blockchain_identifier cannot be empty")
+        payload = {"network": self.network, "blockchainIdentifier": blockchain_identifier, "includeHistory": "false"}
+        status, body = await self.config.http_client.request(
+            "POST", f"{self.config.payment_service_url}/payment/resolve-blockchain-identifier",
+            headers=self._headers, json=payload
+        )
+        if status == 404:
+            return {"status": "error", "message": f"Payment {blockchain_identifier} not found", "data": None}
+        if status != 200:
+            logger.error(f"Status check failed for payment {blockchain_identifier} with status {status}: {body}")
+            raise Exception(f"Status check failed: {body}")
+        return json.loads(body)
+
+    async def resolve_payment_states(self, blockchain_identifiers, concurrency=10):
+        """
+        On-chain state of each payment, looked up by identifier
+
+        Costs one request per payment however long the agent's payment
+        history is, with at most ``concurrency`` requests in flight.
+
+        Returns:
+            {blockchain_identifier: onChainState or None}; payments whose
+            lookup failed are left out
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(blockchain_identifier):
+            async with semaphore:
+                result = await self.check_payment_status_by_identifier(blockchain_identifier)
+            return (result.get("data") or {}).get("onChainState")
+
+        identifiers = list(blockchain_identifiers)
+        results = await asyncio.gather(*(resolve(i) for i in identifiers), return_exceptions=True)
+        states = {}
+        for blockchain_identifier, result in zip(identifiers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not look up payment {blockchain_identifier}: {str(result)}")
+            else:
+                states[blockchain_identifier] = result
+        return states
+
+    async def is_result_submitted(self, blockchain_identifier):
+        """
+        Whether a result was already submitted for this payment
+
+        True once the service holds a result hash for it, the submission is
+        requested or on its way, or the payment moved past FundsLocked because
+        of it; used to tell a duplicate submission from a failed one.
+        """
+        result = await self.check_payment_status_by_identifier(blockchain_identifier)
+        payment = result.get("data") or {}
+        requested_action = (payment.get("NextAction") or {}).get("requestedAction")
+        return bool(payment.get("resultHash")) \
+            or payment.get("onChainState") in self.RESULT_SUBMITTED_STATES \
+            or requested_action in self.RESULT_SUBMITTING_ACTIONS
+
+    async def complete_payment(self, blockchain_identifier, job_output):
+        """Submit the result hash of a job; see masumi's Payment.complete_payment"""
+        if not isinstance(job_output, str):
+            raise TypeError("job_output must be a string")
+        payload = {
+            "network": self.network,
+            "blockchainIdentifier": blockchain_identifier,
+            "submitResultHash": create_masumi_output_hash(job_output, self.identifier_from_purchaser),
+        }
+        result = await self._send("POST", "/payment/submit-result", "Payment completion", json=payload)
+        logger.info(f"Payment completion request successful for {blockchain_identifier}")
+        return result
@@ -0,0 +1,221 @@
+import os
+import time
+import asyncio
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PaymentPoller:
+    """
+    Single background poller for every job that is awaiting payment.
+
+    Instead of one ``Payment.start_status_monitoring`` loop per job, the poller
+    keeps a table of pending blockchain identifiers and looks up the due ones
+    by identifier each tick, up to ``batch_size`` of them with at most
+    ``concurrency`` requests in flight, so a tick costs as much as the number
+    of due payments, however long the agent's payment history. The tick
+    interval adapts: it drops to ``min_interval`` while new payments are
+    arriving and doubles towards ``max_interval`` while nothing changes.
+    Entries older than ``stale_after`` back off individually, and entries older
+    than ``expire_after`` are dropped and reported through ``on_expired``.
+    """
+
+    CONFIRMED_STATES = {"FundsLocked"}
+
+    def __init__(self, payment_instances, on_confirmed, min_interval=5.0, max_interval=60.0,
+                 batch_size=100, stale_after=600.0, expire_after=13 * 3600.0, on_state_change=None,
+                 on_expired=None, concurrency=10):
+        """
+        Args:
+            payment_instances: Mapping of job_id -> masumi Payment
+            on_confirmed: Async callable(job_id, blockchain_identifier), run once per payment
+            min_interval: Fastest tick interval in seconds
+            max_interval: Slowest tick interval in seconds
+            batch_size: Most payments looked up in one tick (the most overdue first)
+            stale_after: Age in seconds after which an entry is checked less often
+            expire_after: Age in seconds after which an unpaid entry is dropped
+            on_state_change: Optional callable(job_id, state) for observed state changes
+            on_expired: Optional callable(job_id) for payments dropped unpaid
+            concurrency: Lookups in flight at once
+        """
+        self.payment_instances = payment_instances
+        self.on_confirmed = on_confirmed
+        self.on_state_change = on_state_change
+        self.on_expired = on_expired
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.stale_after = stale_after
+        self.expire_after = expire_after
+        self.interval = min_interval
+        # job_id -> {"blockchain_identifier", "added_at", "next_check", "misses"}
+        self._pending = {}
+        self._dispatch_tasks = set()
+        # job_id -> (on-chain state, monotonic time it was observed)
+        self.last_status = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.requests_sent = 0
+
+    @classmethod
+    def from_env(cls, payment_instances, on_confirmed, on_state_change=None, on_expired=None):
+        """Build a poller from the PAYMENT_POLL_* environment variables"""
+        return cls(
+            payment_instances,
+            on_confirmed,
+            on_state_change=on_state_change,
+            on_expired=on_expired,
+            min_interval=float(os.getenv("PAYMENT_POLL_MIN_INTERVAL", "5")),
+            max_interval=float(os.getenv("PAYMENT_POLL_MAX_INTERVAL", "60")),
+            batch_size=int(os.getenv("PAYMENT_POLL_BATCH_SIZE", "100")),
+            concurrency=int(os.getenv("PAYMENT_POLL_CONCURRENCY", "10")),
+        )
+
+    def track(self, job_id, blockchain_identifier, created_at=None):
+        """
+        Start watching a payment; the next tick happens promptly
+
+        Args:
+            created_at: Wall-clock time the job was created, so a payment
+                restored after a restart keeps its age instead of starting over
+        """
+        now = time.monotonic()
+        age = max(0.0, time.time() - created_at) if created_at is not None else 0.0
+        self._pending[job_id] = {
+            "blockchain_identifier": blockchain_identifier,
+            "added_at": now - age,
+            "next_check": now,
+            "misses": 0,
+        }
+        self.interval = self.min_interval
+        self._wakeup.set()
+
+    def untrack(self, job_id):
+        """Stop watching a job's payment"""
+        self._pending.pop(job_id, None)
+        self.last_status.pop(job_id, None)
+
+    def untrack_all(self):
+        """Stop watching every payment; returns the job ids that were tracked"""
+        job_ids = list(self._pending)
+        self._pending.clear()
+        self.last_status.clear()
+        return job_ids
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Payment poller started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Payment poller stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                changed = await self.poll_once()
+                if changed:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.interval * 2, self.max_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error during payment polling: {str(e)}", exc_info=True)
+                self.interval = self.max_interval
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _entry_backoff(self, entry, now):
+        """Interval until the next check of a single entry"""
+        if now - entry["added_at"] < self.stale_after:
+            return self.min_interval
+        return min(self.min_interval * (2 ** entry["misses"]), self.max_interval * 4)
+
+    async def poll_once(self):
+        """
+        Look up the due payments, at most ``batch_size`` of them
+
+        Returns:
+            True if any tracked payment changed state or was dispatched, or
+            more payments are due than one tick looks up
+        """
+        now = time.monotonic()
+        for job_id, entry in list(self._pending.items()):
+            if now - entry["added_at"] > self.expire_after:
+                logger.warning(f"Payment for job {job_id} expired without confirmation, no longer polling")
+                self.untrack(job_id)
+                if self.on_expired is not None:
+                    self.on_expired(job_id)
+
+        due = sorted((entry["next_check"], job_id) for job_id, entry in self._pending.items() if entry["next_check"] <= now)
+        if not due:
+            return False
+        batch = [job_id for _, job_id in due[:self.batch_size]]
+
+        # Lookups go by identifier, so any job's Payment can make them
+        payment = next((self.payment_instances[j] for j in batch if j in self.payment_instances), None)
+        if payment is None:
+            return False
+
+        states = await payment.resolve_payment_states(
+            [self._pending[j]["blockchain_identifier"] for j in batch], concurrency=self.concurrency
+        )
+        self.requests_sent += len(batch)
+        logger.debug(f"Payment poll resolved {len(states)} of {len(batch)} looked up ({len(due)} due)")
+
+        changed = len(due) > len(batch)
+        seen_at = time.monotonic()
+        for job_id in batch:
+            entry = self._pending.get(job_id)
+            if entry is None:
+                continue
+            blockchain_identifier = entry["blockchain_identifier"]
+            if blockchain_identifier not in states:
+                # The lookup failed: keep what is known and try again later
+                entry["misses"] += 1
+                entry["next_check"] = seen_at + self._entry_backoff(entry, seen_at)
+                continue
+            state = states[blockchain_identifier]
+            previous = self.last_status.get(job_id, (None, None))[0]
+            self.last_status[job_id] = (state, seen_at)
+            if state != previous:
+                changed = True
+                entry["misses"] = 0
+                if self.on_state_change is not None:
+                    self.on_state_change(job_id, state)
+            else:
+                entry["misses"] += 1
+            entry["next_check"] = seen_at + self._entry_backoff(entry, seen_at)
+
+            if state in self.CONFIRMED_STATES:
+                changed = True
+                self._dispatch(job_id, blockchain_identifier)
+        return changed
+
+    def _dispatch(self, job_id, blockchain_identifier):
+        """Run the confirmation callback exactly once per payment"""
+        if self._pending.pop(job_id, None) is None:
+            return
+        logger.info(f"Payment {blockchain_identifier} confirmed for job {job_id}, dispatching")
+        task = asyncio.create_task(self.on_confirmed(job_id, blockchain_identifier))
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
@@ -0,0 +1,70 @@
+import os
+import time
+from singleflight import SingleFlight
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class PaymentStatusCache:
+    """
+    Short-lived cache of per-job payment status for GET /status.
+
+    A cached status younger than ``ttl_seconds`` is served as-is. When the
+    payment poller has observed the job more recently than the cache, its
+    state is used instead. Otherwise one upstream call is made per job, and
+    concurrent requests for the same job share it.
+    """
+
+    def __init__(self, ttl_seconds=10.0):
+        self.ttl_seconds = ttl_seconds
+        # job_id -> (status, monotonic time it was observed)
+        self._entries = {}
+        self._flights = SingleFlight()
+        self._counters = {"hits": 0, "poller_hits": 0, "fetches": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(ttl_seconds=float(os.getenv("PAYMENT_STATUS_TTL", "10")))
+
+    async def get(self, job_id, fetch, known=None):
+        """
+        Return (status, age_seconds) for a job's payment
+
+        Args:
+            job_id: The job whose payment is looked up
+            fetch: Zero-argument callable returning an awaitable status
+            known: Optional (status, monotonic observed_at) from the poller
+
+        Raises:
+            Whatever ``fetch`` raises; failed fetches are not cached
+        """
+        now = time.monotonic()
+        entry = self._entries.get(job_id)
+        if known is not None and known[1] is not None and (entry is None or known[1] > entry[1]):
+            entry = known
+            self._entries[job_id] = known
+            if now - entry[1] < self.ttl_seconds:
+                self._counters["poller_hits"] += 1
+                return entry[0], now - entry[1]
+        if entry is not None and now - entry[1] < self.ttl_seconds:
+            self._counters["hits"] += 1
+            return entry[0], now - entry[1]
+
+        async def fetch_and_store():
+            self._counters["fetches"] += 1
+            status = await fetch()
+            self._entries[job_id] = (status, time.monotonic())
+            return status
+
+        status = await self._flights.do(job_id, fetch_and_store)
+        observed = self._entries.get(job_id)
+        return status, (time.monotonic() - observed[1]) if observed else 0.0
+
+    def forget(self, job_id):
+        self._entries.pop(job_id, None)
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["entries"] = len(self._entries)
+        return stats
@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import threading
+from functools import lru_cache
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Providers only cache prompt prefixes from roughly this length (OpenAI: 1024 tokens)
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_prefix_stats = {}
+# Prompt files already reported missing, so each is warned about once
+_missing_files = set()
+
+
+def count_tokens(text):
+    """Token count with tiktoken when available, else ~4 characters per token"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def _static_text(text):
+    """
+    Canonical form of static prompt material
+
+    Line endings and trailing whitespace are normalised so the prefix is
+    byte-identical across hosts, and braces are replaced so crewai's input
+    interpolation can never splice per-job values into it.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.replace("{", "(").replace("}", ")").strip()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+@lru_cache(maxsize=64)
+def _assemble(role, goal, backstory, persona, pinned):
+    sections = [_static_text(backstory)]
+    if persona is not None:
+        with open(persona[0], encoding="utf-8", errors="replace") as handle:
+            sections.append("## Persona\n" + _static_text(handle.read()))
+    for path, _, _ in pinned:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            sections.append(f"## Reference: {os.path.basename(path)}\n" + _static_text(handle.read()))
+    static_backstory = "\n\n".join(sections)
+    # Roughly what crewai puts in front of every call for this agent
+    tokens = count_tokens(f"You are {role}. {static_backstory}\nYour personal goal is: {goal}")
+    digest = hashlib.sha256(f"{role}\0{goal}\0{static_backstory}".encode("utf-8")).hexdigest()
+    return static_backstory, tokens, digest
+
+
+def static_backstory(role, goal, backstory, persona_path=None, pinned_paths=()):
+    """
+    Build an agent's backstory with all static material folded in
+
+    The result only depends on the arguments and the pinned files' contents,
+    so crewai's system prompt for the agent is the same bytes on every job
+    and the per-job ``{text}`` stays in the task prompt. Provider-side prompt
+    caching can then reuse the prefix. Results are memoised per agent
+    configuration and file version.
+
+    Args:
+        role: Agent role
+        goal: Agent goal
+        backstory: Agent backstory
+        persona_path: Optional file with the persona / voice guide
+        pinned_paths: Files whose full text every call should see
+
+    Returns:
+        The backstory to pass to crewai's Agent
+    """
+    return _static_prefix(role, goal, backstory, persona_path, pinned_paths)[0]
+
+
+def _static_prefix(role, goal, backstory, persona_path, pinned_paths):
+    """(backstory, digest) for the current version of the files; only stats them when unchanged"""
+    persona = _file_signature(persona_path) if persona_path else None
+    pinned = tuple(_file_signature(path) for path in pinned_paths)
+    text, tokens, digest = _assemble(role, goal, backstory, persona, pinned)
+    if _prefix_stats.get(role, {}).get("tokens") != tokens:
+        logger.info(f"Static prompt prefix for {role}: {tokens} tokens")
+    _prefix_stats[role] = {"tokens": tokens, "provider_cacheable": tokens >= PROVIDER_CACHE_MIN_TOKENS}
+    return text, digest
+
+
+def _prompt_files_from_env():
+    """
+    (persona_path, pinned_paths) from PROMPT_PERSONA_FILE and PROMPT_PINNED_FILES
+
+    Missing files are skipped, with a warning the first time each is missed.
+    """
+    directory = os.getenv("KNOWLEDGEBASE_DIR", "knowledgebase")
+
+    def resolve(name):
+        path = os.path.join(directory, name.strip())
+        if os.path.isfile(path):
+            _missing_files.discard(path)
+            return path
+        if path not in _missing_files:
+            _missing_files.add(path)
+            logger.warning(f"Prompt file {path} not found, leaving it out of the prefix")
+        return None
+
+    persona = os.getenv("PROMPT_PERSONA_FILE")
+    persona_path = resolve(persona) if persona else None
+    pinned = [resolve(name) for name in os.getenv("PROMPT_PINNED_FILES", "").split(",") if name.strip()]
+    return persona_path, tuple(path for path in pinned if path)
+
+
+def static_backstory_from_env(role, goal, backstory):
+    """
+    static_backstory() with the persona and pinned files from the environment
+
+    PROMPT_PERSONA_FILE and PROMPT_PINNED_FILES (comma-separated) are read
+    relative to KNOWLEDGEBASE_DIR. Missing files are skipped with a warning.
+    """
+    return static_backstory(role, goal, backstory, *_prompt_files_from_env())
+
+
+def static_prefix_digest_from_env(role, goal, backstory):
+    """
+    Digest of the prefix static_backstory_from_env() builds, for fingerprints
+
+    Called once per job: the files are only read again after they change,
+    and the (possibly large) prefix is hashed once per version.
+    """
+    return _static_prefix(role, goal, backstory, *_prompt_files_from_env())[1]
+
+
+def prefix_stats():
+    """Static prefix token count per agent role"""
+    return dict(_prefix_stats)
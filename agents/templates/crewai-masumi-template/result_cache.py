@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResultCache:
+    """
+    Two-tier cache for finished crew results.
+
+    The memory tier is an LRU with per-entry expiry; the optional disk tier
+    is a small SQLite table that survives restarts and is trimmed by last
+    access time. Values are raw result strings.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=86400.0, path=None, max_disk_entries=10000):
+        """
+        Args:
+            max_entries: Entries kept in memory
+            ttl_seconds: Lifetime of a cached result
+            path: SQLite file for the disk tier (None = memory only)
+            max_disk_entries: Entries kept on disk
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "evictions": 0, "stores": 0}
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access);
+            """)
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from the RESULT_CACHE_* environment variables, or None if disabled"""
+        if os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "86400")),
+            path=os.getenv("RESULT_CACHE_PATH", "data/result_cache.db") or None,
+            max_disk_entries=int(os.getenv("RESULT_CACHE_DISK_SIZE", "10000")),
+        )
+
+    @staticmethod
+    def make_key(input_hash, input_data, crew_config, scope="hash"):
+        """
+        Build a cache key for one job
+
+        Masumi's input_hash (MIP-004) is salted with identifier_from_purchaser,
+        so with ``scope="hash"`` only repeats from the same purchaser hit. With
+        ``scope="content"`` the key is derived from the canonical input_data and
+        is shared across purchasers.
+        """
+        if scope == "content" or not input_hash:
+            subject = json.dumps(input_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        else:
+            subject = input_hash
+        config = json.dumps(crew_config, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{scope}|{subject}|{config}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached result for ``key``, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits_memory"] += 1
+                    return value
+                del self._memory[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+                    self._store_memory_locked(key, row[0], row[1])
+                    self._counters["hits_disk"] += 1
+                    return row[0]
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        """Cache a result string"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._store_memory_locked(key, value, expires_at)
+            self._counters["stores"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                self._trim_disk_locked(now)
+
+    def _store_memory_locked(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _trim_disk_locked(self, now):
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits_memory"] + stats["hits_disk"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits_memory"] + stats["hits_disk"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProgressFanOut:
+    """
+    Hands the progress events of one shared run to every caller waiting on it.
+
+    ``publish`` may be called from any thread (crews run in worker threads).
+    A listener added after the run started is first replayed the events it
+    missed, so every caller sees the whole run in order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._history = []
+
+    def add(self, listener):
+        with self._lock:
+            for event, details in self._history:
+                listener(event, **details)
+            self._listeners.append(listener)
+
+    def remove(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, event, **details):
+        with self._lock:
+            self._history.append((event, details))
+            for listener in self._listeners:
+                listener(event, **details)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers that arrive while it
+    is still running await the same future and receive the same result (or
+    exception). Once the work finishes the key is forgotten, so later calls
+    start a new execution.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        # key -> ProgressFanOut of the in-flight run
+        self._progress = {}
+        self._counters = {"leaders": 0, "followers": 0}
+
+    async def do(self, key, fn, listener=None):
+        """
+        Run ``fn()`` once per in-flight ``key``
+
+        Args:
+            key: Hashable identity of the work
+            fn: Callable returning an awaitable. Without ``listener`` it takes
+                no arguments; with one it is passed a progress callback
+                ``(event, **details)`` to report through
+            listener: Optional callable(event, **details) that receives the
+                progress of the run this call executes or joins
+
+        Returns:
+            The result of the shared execution
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self._counters["leaders"] += 1
+            progress = ProgressFanOut()
+            if listener is not None:
+                progress.add(listener)
+            task = asyncio.ensure_future(fn(progress.publish) if listener is not None else fn())
+            self._inflight[key] = task
+            self._progress[key] = progress
+
+            def forget(_task):
+                self._inflight.pop(key, None)
+                self._progress.pop(key, None)
+
+            task.add_done_callback(forget)
+        else:
+            self._counters["followers"] += 1
+            logger.info(f"Joining in-flight run for key {str(key)[:12]}...")
+            progress = self._progress[key]
+            if listener is not None:
+                progress.add(listener)
+        try:
+            # Shield so one caller going away does not cancel the run for the others
+            return await asyncio.shield(task)
+        finally:
+            if listener is not None:
+                progress.remove(listener)
+
+    def inflight_count(self):
+        return len(self._inflight)
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["inflight"] = len(self._inflight)
+        return stats
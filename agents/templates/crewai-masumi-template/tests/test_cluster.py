@@ -0,0 +1,32 @@
+import asyncio
+
+from cluster import FileLock, LeaderElection
+
+
+def test_failed_leader_releases_the_lock_and_stands_again(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    terms = []
+
+    async def on_elected():
+        terms.append(len(terms) + 1)
+        if len(terms) == 1:
+            raise RuntimeError("job store unavailable")
+        await asyncio.Event().wait()
+
+    async def scenario():
+        election = LeaderElection(path, on_elected, retry_interval=0.05)
+        election.start()
+        while not terms:
+            await asyncio.sleep(0.01)
+        # Another worker can take over once the failed leader stepped down
+        other = FileLock(path)
+        while not other.try_acquire():
+            await asyncio.sleep(0.01)
+        assert not election.is_leader
+        other.release()
+        while len(terms) < 2:
+            await asyncio.sleep(0.01)
+        assert election.is_leader
+        await election.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
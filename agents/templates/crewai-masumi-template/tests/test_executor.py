@@ -0,0 +1,62 @@
+import time
+import asyncio
+import pytest
+
+from executor import CrewExecutor, CrewCancelledError
+
+
+def test_runs_at_most_max_workers_at_once():
+    executor = CrewExecutor(max_workers=2)
+    running = []
+    peak = []
+
+    def work():
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.05)
+        running.pop()
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(executor.submit(f"job-{i}", work) for i in range(6)))
+
+    assert asyncio.run(run()) == ["done"] * 6
+    assert max(peak) <= 2
+    executor.shutdown()
+
+
+def test_cancel_while_queued_raises_and_later_jobs_run():
+    executor = CrewExecutor(max_workers=1)
+
+    async def run():
+        first = asyncio.create_task(executor.submit("first", time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(executor.submit("second", lambda: "second"))
+        await asyncio.sleep(0.01)
+        executor.cancel("second")
+        with pytest.raises(CrewCancelledError):
+            await second
+        await first
+        return await executor.submit("third", lambda: "third")
+
+    assert asyncio.run(run()) == "third"
+    executor.shutdown()
+
+
+def test_caller_cancelled_while_queued_does_not_lose_the_slot():
+    executor = CrewExecutor(max_workers=1)
+
+    async def run():
+        first = asyncio.create_task(executor.submit("first", time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(executor.submit("waiting", lambda: "never"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await first
+        return await asyncio.wait_for(executor.submit("later", lambda: "later"), timeout=2)
+
+    assert asyncio.run(run()) == "later"
+    assert executor.stats()["queued"] == 0
+    executor.shutdown()
@@ -0,0 +1,96 @@
+import time
+import pytest
+
+from job_store import JobStore, MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryJobStore() if request.param == "memory" else SQLiteJobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+def create(store, job_id, **fields):
+    fields = dict(
+        status="awaiting_payment",
+        payment_status="pending",
+        blockchain_identifier=f"bid-{job_id}",
+        identifier_from_purchaser="purchaser",
+        input_data={"text": job_id},
+        **fields,
+    )
+    store.create(job_id, **fields)
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
+
+
+def test_create_get_and_update(store):
+    create(store, "a")
+    job = store.get("a")
+    assert job["status"] == "awaiting_payment"
+    assert job["input_data"] == {"text": "a"}
+    assert store.get_status("a") == ("awaiting_payment", "pending")
+    assert "a" in store and "missing" not in store
+    assert store.get("missing") is None
+
+    store.update("a", status="completed", payment_status="completed", result="answer")
+    job = store.get("a")
+    assert (job["status"], job["result"]) == ("completed", "answer")
+    assert job["updated_at"] >= job["created_at"]
+
+
+def test_find_set_status_and_counts(store):
+    for job_id in ("a", "b", "c"):
+        create(store, job_id)
+    assert store.set_status(["a", "b"], "failed", error="boom") == 2
+
+    assert {job["job_id"] for job in store.find(status="failed")} == {"a", "b"}
+    assert [job["job_id"] for job in store.find(blockchain_identifier="bid-c")] == ["c"]
+    assert len(store.find(identifier_from_purchaser="purchaser", limit=2)) == 2
+    assert store.count_by_status() == {"failed": 2, "awaiting_payment": 1}
+
+
+def test_find_created_after_returns_tracking_fields_oldest_first(store):
+    for job_id in ("a", "b", "c"):
+        create(store, job_id)
+        time.sleep(0.01)
+    store.update("b", status="paid")
+    cutoff = store.get("a")["created_at"]
+
+    assert store.find_created_after("awaiting_payment", 0) == [
+        {"job_id": job_id, "blockchain_identifier": f"bid-{job_id}", "identifier_from_purchaser": "purchaser",
+         "created_at": store.get(job_id)["created_at"]}
+        for job_id in ("a", "c")
+    ]
+    assert [job["job_id"] for job in store.find_created_after("awaiting_payment", cutoff)] == ["c"]
+
+
+def test_purge_expired_only_deletes_old_finished_jobs(store):
+    create(store, "old-done")
+    create(store, "old-waiting")
+    create(store, "new-done")
+    store.update("old-done", status="completed")
+    time.sleep(0.2)
+    store.update("new-done", status="completed")
+
+    assert store.purge_expired(0.1) == 1
+    assert store.get("old-done") is None
+    assert store.get("old-waiting") is not None
+    assert store.get("new-done") is not None
+
+
+def test_sqlite_store_survives_reopening(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    create(store, "a")
+    store.update("a", status="running", worker="w1")
+    store.close()
+
+    reopened = SQLiteJobStore(path)
+    job = reopened.get("a")
+    assert (job["status"], job["worker"], job["input_data"]) == ("running", "w1", {"text": "a"})
+    reopened.close()
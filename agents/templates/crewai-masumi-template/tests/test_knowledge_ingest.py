@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import knowledge_ingest
+from knowledge_index import KnowledgeIndex, load_or_build_index
+
+
+def make_knowledgebase(tmp_path):
+    directory = tmp_path / "knowledgebase"
+    directory.mkdir()
+    (directory / "good.txt").write_text("Masumi agents are paid per job on Cardano.")
+    (directory / "broken.pdf").write_bytes(b"not a pdf")
+    return directory
+
+
+def test_failed_documents_are_recorded_in_the_manifest(tmp_path, monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_CACHE_DIR", str(tmp_path / "cache"))
+    directory = make_knowledgebase(tmp_path)
+
+    stats = knowledge_ingest.ingest_directory(str(directory), str(tmp_path / "index"), workers=1)
+
+    assert stats["failed"] == ["broken.pdf"]
+    manifest = json.loads((tmp_path / "cache" / knowledge_ingest.MANIFEST_NAME).read_text())
+    assert manifest["broken.pdf"]["failed"]
+    assert manifest["broken.pdf"]["sha256"] == knowledge_ingest.file_sha256(str(directory / "broken.pdf"))
+    index = KnowledgeIndex.load(str(tmp_path / "index"))
+    assert set(index.meta["fingerprint"]) == {"good.txt", "broken.pdf"}
+    index.close()
+
+
+def test_failed_documents_are_retried_only_once_changed(tmp_path, monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "1")
+    directory = make_knowledgebase(tmp_path)
+    knowledge_ingest.ingest_directory(str(directory), str(tmp_path / "index"))
+
+    parsed = []
+    ingest_file = knowledge_ingest.ingest_file
+
+    def tracking_ingest_file(path, source, chunk_path):
+        parsed.append(source)
+        return ingest_file(path, source, chunk_path)
+
+    monkeypatch.setattr(knowledge_ingest, "ingest_file", tracking_ingest_file)
+    # Nothing changed: the saved index is current and nothing is parsed
+    load_or_build_index(str(directory), str(tmp_path / "index")).close()
+    assert parsed == []
+    # Touching the file without changing it does not retry it either
+    os.utime(directory / "broken.pdf", ns=(1, 1))
+    load_or_build_index(str(directory), str(tmp_path / "index")).close()
+    assert parsed == []
+
+    # A new version of the document is tried again
+    (directory / "broken.pdf").write_bytes(b"still not a pdf, but different")
+    index = load_or_build_index(str(directory), str(tmp_path / "index"))
+
+    assert parsed == ["broken.pdf"]
+    assert len(index) == 1
+    index.close()
+
+
+def test_concurrent_starts_build_the_index_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("KNOWLEDGE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "1")
+    directory = make_knowledgebase(tmp_path)
+    (directory / "broken.pdf").unlink()
+
+    builds = []
+    ingest_directory = knowledge_ingest.ingest_directory
+
+    def slow_ingest_directory(*args, **kwargs):
+        builds.append(threading.get_ident())
+        time.sleep(0.2)
+        return ingest_directory(*args, **kwargs)
+
+    monkeypatch.setattr(knowledge_ingest, "ingest_directory", slow_ingest_directory)
+    # Each worker process opens its own lock file handle; threads do the same here
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        indexes = list(pool.map(lambda _: load_or_build_index(str(directory), str(tmp_path / "index")), range(3)))
+
+    assert len(builds) == 1
+    assert [len(index) for index in indexes] == [1, 1, 1]
+    for index in indexes:
+        index.close()
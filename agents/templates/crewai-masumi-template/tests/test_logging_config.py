@@ -0,0 +1,33 @@
+import logging
+from logging.handlers import RotatingFileHandler, WatchedFileHandler
+
+import logging_config
+from cluster import FileLock
+
+
+def file_handler():
+    return next(h for h in logging.getLogger().handlers if isinstance(h, logging.FileHandler))
+
+
+def test_only_the_lock_holder_rotates_the_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(logging_config, "_rotation_lock", None)
+    # Another process on the host already rotates the file
+    other = FileLock(str(tmp_path / "logs" / "app.log.lock"))
+    assert other.try_acquire()
+    try:
+        logging_config.setup_logging(async_mode=False)
+        handler = file_handler()
+        assert isinstance(handler, WatchedFileHandler)
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+
+        # Once that process is gone, the next one to set up logging takes over
+        other.release()
+        logging_config.setup_logging(async_mode=False)
+        handler = file_handler()
+        assert isinstance(handler, RotatingFileHandler)
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+    finally:
+        logging_config._rotation_lock.release()
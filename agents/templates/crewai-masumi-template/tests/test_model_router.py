@@ -0,0 +1,49 @@
+import pytest
+
+import model_router
+from model_router import ModelRoute, ModelRouter, RoutingLLM
+
+ROUTE_VARIABLES = ("LLM_ROUTE_MODELS", "LLM_ROUTE_RESEARCHER", "LLM_ROUTE_WRITER")
+
+
+@pytest.fixture
+def route_env(monkeypatch):
+    for name in ROUTE_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(model_router, "_router", None)
+    return monkeypatch
+
+
+def test_parse_list_keeps_order_and_limits():
+    routes = ModelRoute.parse_list("gpt-5-nano:8000, gpt-5-mini")
+    assert [(route.model, route.max_input_chars) for route in routes] == [("gpt-5-nano", 8000), ("gpt-5-mini", None)]
+
+
+@pytest.mark.parametrize("spec", [",", ":8000", "gpt-5-nano,:100"])
+def test_from_env_rejects_route_lists_without_models(route_env, spec):
+    route_env.setenv("LLM_ROUTE_WRITER", spec)
+    with pytest.raises(ValueError, match="LLM_ROUTE_WRITER"):
+        ModelRouter.from_env()
+
+
+def test_task_without_routes_is_not_routed(route_env):
+    route_env.setenv("LLM_ROUTE_RESEARCHER", "gpt-5-nano,gpt-5-mini")
+    router = ModelRouter.from_env()
+
+    assert [route.model for route in router.routes_for("researcher")] == ["gpt-5-nano", "gpt-5-mini"]
+    assert router.routes_for("writer") == []
+    assert RoutingLLM(router, "researcher", lambda model: None).model == "gpt-5-nano"
+    with pytest.raises(ValueError):
+        RoutingLLM(router, "writer", lambda model: None)
+
+
+def test_crew_uses_plain_llm_for_unrouted_task(route_env):
+    from crew_definition import ResearchCrew
+
+    route_env.setenv("KNOWLEDGE_ENABLED", "false")
+    route_env.setenv("LLM_ROUTE_RESEARCHER", "gpt-5-nano")
+    crew = ResearchCrew(verbose=False, model="gpt-5-mini")
+
+    assert isinstance(crew.researcher_llm, RoutingLLM)
+    assert not isinstance(crew.writer_llm, RoutingLLM)
+    assert crew.writer_llm.model == "gpt-5-mini"
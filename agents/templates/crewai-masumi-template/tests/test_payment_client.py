@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from payment_client import PooledConfig, PooledPayment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+
+class FakeHttpClient:
+    """Serves status pages of ``page_size`` payments, newest first"""
+
+    def __init__(self, identifiers, page_size):
+        self.identifiers = identifiers
+        self.page_size = page_size
+        self.pages_served = 0
+
+    async def request(self, method, url, headers=None, params=None, **kwargs):
+        start = int(params.get("cursorId") or 0)
+        page = self.identifiers[start:start + self.page_size]
+        self.pages_served += 1
+        cursor = str(start + self.page_size) if start + self.page_size < len(self.identifiers) else None
+        payments = [{"blockchainIdentifier": identifier, "onChainState": "FundsLocked"} for identifier in page]
+        return 200, json.dumps({"data": {"Payments": payments, "cursorId": cursor}})
+
+
+class FakeMasumiClient:
+    """Routes PooledPayment calls to the benchmark payment service in-process"""
+
+    def __init__(self, client):
+        self.client = client
+        self.requests = 0
+
+    async def request(self, method, url, headers=None, params=None, json=None):
+        self.requests += 1
+        response = self.client.request(method, url.removeprefix("http://payments"), params=params, json=json)
+        return response.status_code, response.text
+
+
+def make_payment(http_client):
+    config = PooledConfig(payment_service_url="http://payments/api/v1", payment_api_key="key", http_client=http_client)
+    return PooledPayment(agent_identifier="agent", config=config)
+
+
+@pytest.fixture
+def fake_masumi(monkeypatch):
+    import fake_masumi
+    monkeypatch.setattr(fake_masumi, "RESPONSE_LATENCY", 0)
+    monkeypatch.setattr(fake_masumi, "payments", {})
+    return fake_masumi
+
+
+def test_status_check_stops_once_wanted_payments_are_listed():
+    http_client = FakeHttpClient([f"bid-{n}" for n in range(50)], page_size=10)
+    payment = make_payment(http_client)
+
+    result = asyncio.run(payment.check_payment_status(limit=10, blockchain_identifiers={"bid-3", "bid-14"}))
+
+    assert http_client.pages_served == 2
+    assert {"bid-3", "bid-14"} <= {p["blockchainIdentifier"] for p in result["data"]["Payments"]}
+
+
+def test_status_check_defaults_to_own_payment_ids():
+    http_client = FakeHttpClient([f"bid-{n}" for n in range(50)], page_size=10)
+    payment = make_payment(http_client)
+    payment.payment_ids.add("bid-0")
+
+    asyncio.run(payment.check_payment_status(limit=10))
+
+    assert http_client.pages_served == 1
+
+
+def test_status_check_pages_through_a_long_history(fake_masumi):
+    # More than ten pages of history: the oldest payment is only on the last one
+    for n in range(1050):
+        fake_masumi.payments[f"bid-{n}"] = {"created_at": time.monotonic() - 60, "result_hash": None}
+    http_client = FakeMasumiClient(TestClient(fake_masumi.app))
+    payment = make_payment(http_client)
+
+    newest = asyncio.run(payment.check_payment_status(limit=100, blockchain_identifiers={"bid-1049"}))
+    assert http_client.requests == 1
+    assert newest["data"]["Payments"][0] == {
+        "blockchainIdentifier": "bid-1049", "onChainState": "FundsLocked",
+        "NextAction": {"requestedAction": "WaitingForExternalAction"}, "resultHash": None,
+    }
+
+    oldest = asyncio.run(payment.check_payment_status(limit=100, blockchain_identifiers={"bid-0"}))
+    assert http_client.requests == 1 + 11
+    assert oldest["data"]["Payments"][-1]["blockchainIdentifier"] == "bid-0"
+
+
+def test_payment_states_are_resolved_by_identifier(fake_masumi):
+    for n in range(1050):
+        fake_masumi.payments[f"bid-{n}"] = {"created_at": time.monotonic() - 60, "result_hash": None}
+    fake_masumi.payments["bid-0"]["result_hash"] = "hash"
+    http_client = FakeMasumiClient(TestClient(fake_masumi.app))
+    payment = make_payment(http_client)
+
+    states = asyncio.run(payment.resolve_payment_states(["bid-0", "bid-1049", "bid-unknown"], concurrency=2))
+
+    # One request per payment, however long the history; unknown payments have no state
+    assert http_client.requests == 3
+    assert states == {"bid-0": "ResultSubmitted", "bid-1049": "FundsLocked", "bid-unknown": None}
+
+
+def test_failed_lookups_are_left_out():
+    class FailingHttpClient:
+        async def request(self, method, url, headers=None, json=None):
+            if json["blockchainIdentifier"] == "bid-bad":
+                return 500, "boom"
+            return 200, '{"data": {"onChainState": "FundsLocked"}}'
+
+    states = asyncio.run(make_payment(FailingHttpClient()).resolve_payment_states(["bid-good", "bid-bad"]))
+
+    assert states == {"bid-good": "FundsLocked"}
+
+
+def test_duplicate_submission_is_recognised(fake_masumi):
+    fake_masumi.payments["bid-1"] = {"created_at": time.monotonic() - 60, "result_hash": None}
+    payment = make_payment(FakeMasumiClient(TestClient(fake_masumi.app)))
+
+    assert not asyncio.run(payment.is_result_submitted("bid-1"))
+    asyncio.run(payment.complete_payment("bid-1", "result"))
+    # A second delivery of the same job is rejected, but the result is on record
+    with pytest.raises(ValueError):
+        asyncio.run(payment.complete_payment("bid-1", "result"))
+    assert asyncio.run(payment.is_result_submitted("bid-1"))
@@ -0,0 +1,98 @@
+import time
+import asyncio
+
+from payment_poller import PaymentPoller
+
+
+class FakePayment:
+    """Stands in for a masumi Payment; reports whatever ``states`` holds"""
+
+    def __init__(self, states):
+        self.states = states
+        self.looked_up = []
+
+    async def resolve_payment_states(self, blockchain_identifiers, concurrency=10):
+        self.looked_up.append(list(blockchain_identifiers))
+        return {identifier: self.states[identifier] for identifier in blockchain_identifiers if identifier in self.states}
+
+
+def test_expired_payment_is_dropped_and_reported():
+    expired = []
+    payment = FakePayment({})
+    poller = PaymentPoller({"old": payment, "new": payment}, on_confirmed=None,
+                           expire_after=3600, on_expired=expired.append)
+    poller.track("old", "bid-old", created_at=time.time() - 7200)
+    poller.track("new", "bid-new", created_at=time.time())
+
+    asyncio.run(poller.poll_once())
+
+    assert expired == ["old"]
+    assert poller.pending_count() == 1
+
+
+def test_confirmed_payment_is_dispatched_once():
+    payment = FakePayment({"bid-1": None})
+    dispatched = []
+    states = []
+
+    async def on_confirmed(job_id, blockchain_identifier):
+        dispatched.append((job_id, blockchain_identifier))
+
+    async def run():
+        poller = PaymentPoller({"job-1": payment}, on_confirmed, min_interval=0,
+                               on_state_change=lambda job_id, state: states.append(state))
+        poller.track("job-1", "bid-1")
+        assert not await poller.poll_once()
+        payment.states["bid-1"] = "FundsLocked"
+        assert await poller.poll_once()
+        # Already dispatched: later ticks (and a confirmation seen twice) do nothing
+        await poller.poll_once()
+        poller._dispatch("job-1", "bid-1")
+        await asyncio.sleep(0)
+        return poller
+
+    poller = asyncio.run(run())
+    assert dispatched == [("job-1", "bid-1")]
+    assert states == ["FundsLocked"]
+    assert poller.pending_count() == 0
+
+
+def test_only_due_payments_are_looked_up():
+    payment = FakePayment({"bid-1": None, "bid-2": None})
+    poller = PaymentPoller({"job-1": payment, "job-2": payment}, on_confirmed=None, min_interval=60)
+    poller.track("job-1", "bid-1")
+    poller.track("job-2", "bid-2")
+    asyncio.run(poller.poll_once())
+    poller._pending["job-2"]["next_check"] = 0
+
+    asyncio.run(poller.poll_once())
+
+    assert payment.looked_up == [["bid-1", "bid-2"], ["bid-2"]]
+    assert poller.requests_sent == 3
+
+
+def test_batch_size_caps_lookups_per_tick():
+    payment = FakePayment({f"bid-{n}": None for n in range(5)})
+    poller = PaymentPoller({f"job-{n}": payment for n in range(5)}, on_confirmed=None, min_interval=60, batch_size=2)
+    for n in range(5):
+        poller.track(f"job-{n}", f"bid-{n}")
+
+    # More is due than one tick looks up, so the poller keeps ticking fast
+    assert asyncio.run(poller.poll_once())
+    assert asyncio.run(poller.poll_once())
+    assert not asyncio.run(poller.poll_once())
+    assert sorted(sum(payment.looked_up, [])) == [f"bid-{n}" for n in range(5)]
+
+
+def test_failed_lookup_keeps_the_payment_tracked():
+    payment = FakePayment({})
+    states = []
+    poller = PaymentPoller({"job-1": payment}, on_confirmed=None, min_interval=0,
+                           on_state_change=lambda job_id, state: states.append(state))
+    poller.track("job-1", "bid-1")
+
+    asyncio.run(poller.poll_once())
+
+    assert poller.pending_count() == 1
+    assert "job-1" not in poller.last_status
+    assert states == []
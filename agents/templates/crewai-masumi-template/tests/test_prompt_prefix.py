@@ -0,0 +1,36 @@
+import os
+import logging
+
+import prompt_prefix
+
+
+def test_prefix_is_rebuilt_only_when_a_file_changes(tmp_path, monkeypatch):
+    (tmp_path / "persona.md").write_text("Be brief.")
+    monkeypatch.setenv("KNOWLEDGEBASE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROMPT_PERSONA_FILE", "persona.md")
+    monkeypatch.delenv("PROMPT_PINNED_FILES", raising=False)
+    prompt_prefix._assemble.cache_clear()
+
+    first = prompt_prefix.static_prefix_digest_from_env("Analyst", "goal", "backstory")
+    assert prompt_prefix.static_prefix_digest_from_env("Analyst", "goal", "backstory") == first
+    assert prompt_prefix._assemble.cache_info().misses == 1
+
+    (tmp_path / "persona.md").write_text("Be thorough.")
+    os.utime(tmp_path / "persona.md", ns=(1, 1))
+    assert prompt_prefix.static_prefix_digest_from_env("Analyst", "goal", "backstory") != first
+    assert "Be thorough." in prompt_prefix.static_backstory_from_env("Analyst", "goal", "backstory")
+
+
+def test_missing_prompt_file_is_reported_once(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv("KNOWLEDGEBASE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROMPT_PINNED_FILES", "missing.md")
+    monkeypatch.delenv("PROMPT_PERSONA_FILE", raising=False)
+    monkeypatch.setattr(prompt_prefix, "_missing_files", set())
+
+    with caplog.at_level(logging.WARNING, logger="prompt_prefix"):
+        for _ in range(3):
+            prompt_prefix.static_prefix_digest_from_env("Analyst", "goal", "backstory")
+
+    assert [record.getMessage() for record in caplog.records].count(
+        f"Prompt file {tmp_path / 'missing.md'} not found, leaving it out of the prefix"
+    ) == 1
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_one_run():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(runs) == 1
+    assert flights.stats() == {"leaders": 1, "followers": 4, "inflight": 0}
+
+
+def test_different_keys_and_later_calls_run_again():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return len(runs)
+
+    async def run():
+        await asyncio.gather(flights.do("a", work), flights.do("b", work))
+        await flights.do("a", work)
+
+    asyncio.run(run())
+    assert len(runs) == 3
+
+
+def test_failure_is_shared_and_not_remembered():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flights.inflight_count() == 0
+
+    asyncio.run(run())
+
+
+def test_a_caller_going_away_does_not_cancel_the_run_for_others():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        leaving = asyncio.create_task(flights.do("key", work))
+        staying = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == "result"
+
+
+def test_every_caller_gets_the_progress_of_the_shared_run():
+    flights = SingleFlight()
+    events = {"leader": [], "follower": []}
+
+    async def work(publish):
+        publish("task_started", task="research")
+        await asyncio.sleep(0.02)
+        publish("task_finished", task="research")
+        return "result"
+
+    def listener(name):
+        return lambda event, **details: events[name].append((event, details["task"]))
+
+    async def run():
+        leader = asyncio.create_task(flights.do("key", work, listener=listener("leader")))
+        await asyncio.sleep(0.01)
+        # Joins after task_started was published: it is replayed first
+        return await asyncio.gather(leader, flights.do("key", work, listener=listener("follower")))
+
+    assert asyncio.run(run()) == ["result", "result"]
+    assert events["leader"] == events["follower"] == [("task_started", "research"), ("task_finished", "research")]
@@ -0,0 +1,79 @@
+import time
+
+from work_queue import WorkQueue
+
+
+def open_queue(tmp_path, visibility_timeout=60.0):
+    return WorkQueue(str(tmp_path / "queue.db"), visibility_timeout=visibility_timeout)
+
+
+def test_enqueue_is_idempotent_per_job(tmp_path):
+    queue = open_queue(tmp_path)
+    assert queue.enqueue("job-1", {"blockchain_identifier": "bid"})
+    assert not queue.enqueue("job-1")
+    assert queue.job_ids() == {"job-1"}
+    queue.close()
+
+
+def test_received_message_is_hidden_until_acked(tmp_path):
+    queue = open_queue(tmp_path)
+    queue.enqueue("job-1", {"blockchain_identifier": "bid"})
+
+    [message] = queue.receive("worker-a")
+    assert (message.job_id, message.payload, message.attempts) == ("job-1", {"blockchain_identifier": "bid"}, 1)
+    assert queue.receive("worker-b") == []
+    assert queue.stats() == {"ready": 0, "in_flight": 1, "redelivered": 0}
+
+    assert queue.ack(message.receipt)
+    assert queue.job_ids() == set()
+    queue.close()
+
+
+def test_two_consumers_on_one_file_never_share_a_message(tmp_path):
+    first, second = open_queue(tmp_path), open_queue(tmp_path)
+    for number in range(10):
+        first.enqueue(f"job-{number}")
+
+    received = first.receive("a", limit=6) + second.receive("b", limit=6)
+
+    assert sorted(message.job_id for message in received) == sorted(f"job-{n}" for n in range(10))
+    first.close()
+    second.close()
+
+
+def test_timed_out_delivery_is_redelivered_and_its_receipt_goes_stale(tmp_path):
+    queue = open_queue(tmp_path, visibility_timeout=0.05)
+    queue.enqueue("job-1")
+    [first] = queue.receive("worker-a")
+    time.sleep(0.1)
+
+    [second] = queue.receive("worker-b")
+    assert second.attempts == 2
+    assert second.receipt != first.receipt
+    assert not queue.ack(first.receipt)
+    assert not queue.extend(first.receipt)
+    assert queue.stats()["redelivered"] == 1
+    assert queue.ack(second.receipt)
+    queue.close()
+
+
+def test_extend_keeps_a_message_hidden(tmp_path):
+    queue = open_queue(tmp_path, visibility_timeout=0.05)
+    queue.enqueue("job-1")
+    [message] = queue.receive("worker-a")
+    assert queue.extend(message.receipt, seconds=60)
+    time.sleep(0.1)
+    assert queue.receive("worker-b") == []
+    queue.close()
+
+
+def test_nack_makes_a_message_visible_again(tmp_path):
+    queue = open_queue(tmp_path)
+    queue.enqueue("job-1")
+    [message] = queue.receive("worker-a")
+
+    assert queue.nack(message.receipt)
+    assert not queue.ack(message.receipt)
+    [again] = queue.receive("worker-b")
+    assert (again.job_id, again.attempts) == ("job-1", 2)
+    queue.close()
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueueMessage:
+    """
+    One delivery of a queued job
+
+    Args:
+        message_id: Row id of the message
+        job_id: Job the message is for
+        payload: Decoded JSON payload
+        attempts: Deliveries so far, including this one
+        receipt: Token proving this delivery; needed to ack, nack or extend
+    """
+
+    __slots__ = ("message_id", "job_id", "payload", "attempts", "receipt")
+
+    def __init__(self, message_id, job_id, payload, attempts, receipt):
+        self.message_id = message_id
+        self.job_id = job_id
+        self.payload = payload
+        self.attempts = attempts
+        self.receipt = receipt
+
+
+class WorkQueue:
+    """
+    Durable job queue in a local SQLite file, shared by every process on the host.
+
+    A received message is hidden from other consumers for ``visibility_timeout``
+    seconds. The consumer acks it when the job is done, or extends the
+    timeout while the job is still running. If the consumer dies, the
+    message becomes visible again and another consumer retries the job.
+    Receipts change with every delivery, so a late ack from a consumer whose
+    delivery already timed out is ignored.
+    """
+
+    def __init__(self, path="data/work_queue.db", visibility_timeout=120.0):
+        """
+        Args:
+            path: SQLite file
+            visibility_timeout: Seconds a received message stays hidden unless extended
+        """
+        self.visibility_timeout = visibility_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                visible_at REAL NOT NULL,
+                receipt TEXT,
+                consumer TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_visible_at ON messages(visible_at);
+        """)
+        logger.info(f"Work queue opened at {path}")
+
+    @classmethod
+    def from_env(cls):
+        """Build a queue from WORK_QUEUE_PATH and WORK_QUEUE_VISIBILITY_TIMEOUT"""
+        return cls(
+            path=os.getenv("WORK_QUEUE_PATH", "data/work_queue.db"),
+            visibility_timeout=float(os.getenv("WORK_QUEUE_VISIBILITY_TIMEOUT", "120")),
+        )
+
+    def enqueue(self, job_id, payload=None):
+        """Queue a job; enqueueing a job that is already queued does nothing"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO messages (job_id, payload, visible_at, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(payload or {}), now, now),
+            )
+        return cursor.rowcount == 1
+
+    def receive(self, consumer, limit=1):
+        """
+        Take up to ``limit`` visible messages, oldest first
+
+        Args:
+            consumer: Name of the receiving process, for stats and debugging
+
+        Returns:
+            A list of QueueMessage
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other process can
+            # receive the same messages between our SELECT and UPDATE
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT message_id, job_id, payload, attempts FROM messages "
+                    "WHERE visible_at <= ? ORDER BY message_id LIMIT ?",
+                    (now, int(limit)),
+                ).fetchall()
+                messages = []
+                for message_id, job_id, payload, attempts in rows:
+                    receipt = uuid.uuid4().hex
+                    self._conn.execute(
+                        "UPDATE messages SET attempts = ?, visible_at = ?, receipt = ?, consumer = ? WHERE message_id = ?",
+                        (attempts + 1, now + self.visibility_timeout, receipt, consumer, message_id),
+                    )
+                    messages.append(QueueMessage(message_id, job_id, json.loads(payload), attempts + 1, receipt))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return messages
+
+    def _update_delivery(self, query, params, receipt):
+        with self._lock:
+            cursor = self._conn.execute(query, params + (receipt,))
+        return cursor.rowcount == 1
+
+    def extend(self, receipt, seconds=None):
+        """Keep a received message hidden for another ``seconds``; False if the delivery was lost"""
+        visible_at = time.time() + (seconds if seconds is not None else self.visibility_timeout)
+        return self._update_delivery("UPDATE messages SET visible_at = ? WHERE receipt = ?", (visible_at,), receipt)
+
+    def ack(self, receipt):
+        """Remove a finished message; False if the delivery had already timed out"""
+        return self._update_delivery("DELETE FROM messages WHERE receipt = ?", (), receipt)
+
+    def nack(self, receipt, delay=0.0):
+        """Give a message back for another consumer after ``delay`` seconds"""
+        return self._update_delivery(
+            "UPDATE messages SET visible_at = ?, receipt = NULL, consumer = NULL WHERE receipt = ?",
+            (time.time() + delay,),
+            receipt,
+        )
+
+    def job_ids(self):
+        """Jobs with a message in the queue, delivered or not"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT job_id FROM messages")}
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            ready, in_flight, redelivered = self._conn.execute(
+                "SELECT "
+                "COALESCE(SUM(visible_at <= ?), 0), "
+                "COALESCE(SUM(visible_at > ?), 0), "
+                "COALESCE(SUM(attempts > 1), 0) FROM messages",
+                (now, now),
+            ).fetchone()
+        return {"ready": ready, "in_flight": in_flight, "redelivered": redelivered}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()